@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Offline micro-benchmarks for the progress DB and lyrics stage (no Spotify/Genius/IndicLID calls).
+
+    python bench.py [--profile throughput] sync --rows 12000
+    python bench.py reclassify --rows 1000000
+    python bench.py lyrics --rows 2000 --workers 8 --latency-ms 100 --error-rate 0.02
+
+Runs against a throwaway SQLite file in a temp directory so results reflect real fsync cost.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+import main
+from lyrics_providers import FallbackChain, StubProvider
+
+
+def _synthetic_tracks(n: int) -> list[dict]:
+    return [
+        {
+            "track_id": f"track{i:08d}",
+            "name": f"Song {i}",
+            "artists": f"Artist {i % 500}, Featured {i % 37}",
+            "added_at": f"2024-01-01T00:{(i // 60) % 60:02d}:{i % 60:02d}",
+        }
+        for i in range(n)
+    ]
+
+
+def _fresh_conn(tmpdir: str, name: str) -> sqlite3.Connection:
+    main.CONFIG["db_path"] = os.path.join(tmpdir, name)
+    conn = main.get_conn()
+    main.init_db(conn)
+    return conn
+
+
+def _report(label: str, rows: int, seconds: float) -> None:
+    print(f"{label:<28} {rows:>8} rows  {seconds:8.3f}s  {rows / seconds if seconds else float('inf'):>12.0f} rows/s")
+
+
+def bench_sync(rows: int) -> None:
+    """Stage-1 sync: per-row upsert_track() commits vs one bulk_upsert_tracks() transaction."""
+    tracks = _synthetic_tracks(rows)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        conn = _fresh_conn(tmpdir, "per_row.db")
+        start = time.perf_counter()
+        for t in tracks:
+            main.upsert_track(conn, **t)
+        _report("upsert_track (per row)", rows, time.perf_counter() - start)
+        conn.close()
+
+        conn = _fresh_conn(tmpdir, "bulk.db")
+        start = time.perf_counter()
+        main.bulk_upsert_tracks(conn, tracks)
+        _report("bulk_upsert_tracks (insert)", rows, time.perf_counter() - start)
+        # Second pass exercises the ON CONFLICT path, as on every re-run
+        start = time.perf_counter()
+        main.bulk_upsert_tracks(conn, tracks)
+        _report("bulk_upsert_tracks (update)", rows, time.perf_counter() - start)
+        conn.close()
+
+
+def bench_reclassify(rows: int) -> None:
+    """Set-based reclassify() over a DB of LID'd tracks with 1-3 languages each."""
+    codes = [c for codes in main.LANGUAGE_PLAYLISTS.values() for c in codes]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        conn = _fresh_conn(tmpdir, "reclassify.db")
+        main.bulk_upsert_tracks(conn, _synthetic_tracks(rows))
+        results = []
+        for i in range(rows):
+            n_langs = 1 + i % 3
+            results.append(
+                (f"track{i:08d}", {codes[(i + k) % len(codes)]: ((i * 7919 + k * 104729) % 1000) / 1000 for k in range(n_langs)})
+            )
+        with conn:
+            main._write_language_results(conn, results)
+        start = time.perf_counter()
+        main.reclassify(conn)
+        _report("reclassify (unchanged)", rows, time.perf_counter() - start)
+        main.CONFIG["confidence_auto_add"] += 0.1
+        start = time.perf_counter()
+        n = main.reclassify(conn)
+        print(f"  {n} statuses changed")
+        _report("reclassify (auto_add +0.1)", rows, time.perf_counter() - start)
+        conn.close()
+
+
+def bench_lyrics(rows: int, workers: int, latency_ms: float, error_rate: float, miss_rate: float) -> None:
+    """Stage 2 end to end (grouping, worker pool, DBWriter) against the deterministic StubProvider."""
+    chain = FallbackChain([StubProvider(latency_s=latency_ms / 1000, error_rate=error_rate, miss_rate=miss_rate)])
+    with tempfile.TemporaryDirectory() as tmpdir:
+        conn = _fresh_conn(tmpdir, "lyrics.db")
+        main.bulk_upsert_tracks(conn, _synthetic_tracks(rows))
+        start = time.perf_counter()
+        with main.DBWriter() as writer:
+            outcomes = main.fetch_missing_lyrics(conn, writer, chain, workers=workers)
+        elapsed = time.perf_counter() - start
+        print(f"  outcomes: {outcomes}")
+        _report(f"lyrics ({workers} workers, {latency_ms:g}ms)", rows, elapsed)
+        conn.close()
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", choices=sorted(main.DB_PROFILES), default=main.CONFIG["db_profile"])
+    sub = parser.add_subparsers(dest="bench", required=True)
+    p_sync = sub.add_parser("sync", help="liked-tracks sync into the progress DB")
+    p_sync.add_argument("--rows", type=int, default=12000)
+    p_reclassify = sub.add_parser("reclassify", help="set-based status recompute after a threshold change")
+    p_reclassify.add_argument("--rows", type=int, default=1000000)
+    p_lyrics = sub.add_parser("lyrics", help="stage-2 lyrics fetch against the offline stub provider")
+    p_lyrics.add_argument("--rows", type=int, default=2000)
+    p_lyrics.add_argument("--workers", type=int, default=main.CONFIG["genius_workers"])
+    p_lyrics.add_argument("--latency-ms", type=float, default=main.CONFIG["lyrics_stub_latency_ms"])
+    p_lyrics.add_argument("--error-rate", type=float, default=main.CONFIG["lyrics_stub_error_rate"])
+    p_lyrics.add_argument("--miss-rate", type=float, default=main.CONFIG["lyrics_stub_miss_rate"])
+    args = parser.parse_args()
+    main.CONFIG["db_profile"] = args.profile
+    print(f"SQLite profile: {args.profile}")
+    if args.bench == "sync":
+        bench_sync(args.rows)
+    elif args.bench == "reclassify":
+        bench_reclassify(args.rows)
+    elif args.bench == "lyrics":
+        bench_lyrics(args.rows, args.workers, args.latency_ms, args.error_rate, args.miss_rate)
+
+
+if __name__ == "__main__":
+    main_cli()
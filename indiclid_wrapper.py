@@ -20,14 +20,7 @@ else:
 import torch
 import re
 
-# Major Indian language codes we detect (native + romanized): Hindi, Tamil, Telugu, Malayalam, Kannada
-SOUTH_ASIAN_CODES = {
-    "hin_Deva", "hin_Latn",   # Hindi
-    "tam_Tamil", "tam_Latn",  # Tamil
-    "tel_Telu", "tel_Latn",   # Telugu
-    "mal_Mlym", "mal_Latn",  # Malayalam
-    "kan_Knda", "kan_Latn",  # Kannada
-}
+from lid_scores import SOUTH_ASIAN_CODES, aggregate_line_scores  # noqa: F401 (SOUTH_ASIAN_CODES re-exported)
 
 
 def _softmax_logit(logit: float, all_logits: list[float]) -> float:
@@ -130,16 +123,18 @@ class IndicLIDWrapper:
         Enables multi-label assignment: e.g. {"hin_Latn": 0.9, "tam_Latn": 0.85}
         so a song can be assigned to both Hindi and Tamil playlists.
         """
+        return aggregate_line_scores(self.predict_lines(lyrics))
+
+    def predict_lines(self, lyrics: str) -> list[tuple[str, str, float, str]]:
+        """
+        Per-line LID results as (line, lang_code, confidence, model_name), in line order.
+        Kept raw (all languages, every line) so aggregates can be recomputed without the model.
+        """
         if not (lyrics and lyrics.strip()):
-            return {}
+            return []
         self._ensure_loaded()
         lines = [ln.strip() for ln in re.split(r"[\n]+", lyrics.strip()) if ln.strip()]
         if not lines:
-            return {}
+            return []
         line_results = self._model.batch_predict(lines, batch_size=min(32, len(lines)))
-        max_conf: dict[str, float] = {}
-        for r in line_results:
-            lang, conf = r[1], self._result_to_confidence(r)
-            if lang in SOUTH_ASIAN_CODES:
-                max_conf[lang] = max(max_conf.get(lang, 0.0), conf)
-        return max_conf
+        return [(line, r[1], self._result_to_confidence(r), r[3]) for line, r in zip(lines, line_results)]
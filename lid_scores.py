@@ -0,0 +1,27 @@
+"""
+Model-free half of language ID: the language codes we playlist and the per-track aggregation of
+per-line IndicLID results. Kept apart from indiclid_wrapper.py (which imports torch) so stored
+line scores can be re-aggregated on machines without the model stack.
+"""
+from __future__ import annotations
+
+# Major Indian language codes we detect (native + romanized): Hindi, Tamil, Telugu, Malayalam, Kannada
+SOUTH_ASIAN_CODES = {
+    "hin_Deva", "hin_Latn",   # Hindi
+    "tam_Tamil", "tam_Latn",  # Tamil
+    "tel_Telu", "tel_Latn",   # Telugu
+    "mal_Mlym", "mal_Latn",  # Malayalam
+    "kan_Knda", "kan_Latn",  # Kannada
+}
+
+
+def aggregate_line_scores(line_scores) -> dict[str, float]:
+    """
+    Max confidence per South Asian language code over per-line results.
+    Accepts any iterable of tuples shaped (..., lang_code, confidence, model_name).
+    """
+    max_conf: dict[str, float] = {}
+    for *_line, lang, conf, _model in line_scores:
+        if lang in SOUTH_ASIAN_CODES:
+            max_conf[lang] = max(max_conf.get(lang, 0.0), conf)
+    return max_conf
@@ -0,0 +1,186 @@
+"""
+Title / artist normalization for lyrics lookups (cache keys, query variants, hit matching).
+Works on native scripts too: only case, width, punctuation and whitespace are folded; combining
+marks (e.g. Devanagari matras) are kept.
+"""
+from __future__ import annotations
+
+import re
+import threading
+import unicodedata
+from typing import NamedTuple
+
+# `Kesariya (From "Brahmastra")`, `Tum Hi Ho - From "Aashiqui 2"`, `(From the Movie "X")`
+_FILM_RE = re.compile(
+    r"""\s*(?:[(\[]\s*|\s-\s+)from\s+(?:the\s+)?(?:(?:hindi|tamil|telugu|malayalam|kannada)\s+)?"""
+    r"""(?:movie|film|motion\s+picture|album|web\s+series|series)?\s*["'“”‘’]?(?P<film>[^"'“”‘’()\[\]]+?)["'“”‘’]?\s*(?:[)\]]|$)""",
+    re.IGNORECASE,
+)
+# `(feat. X)`, `[ft. X]`, `(with X)` and a trailing `feat. X`
+_FEAT_RE = re.compile(r"\s*(?:[(\[]\s*(?:feat\.?|ft\.?|featuring|with)\s[^)\]]*[)\]]|\s(?:feat\.?|ft\.?|featuring)\s.*$)", re.IGNORECASE)
+_VERSION_WORDS = (
+    r"remaster(?:ed)?|live|radio\s+edit|edit|single\s+version|album\s+version|version|mono|stereo|acoustic|"
+    r"unplugged|lo-?fi|slowed|reverb|sped\s+up|remix|mix|original\s+motion\s+picture\s+soundtrack|soundtrack|ost"
+)
+# `- Remastered 2011`, `- Live at X`, `(2019 Remaster)`, `[Lofi Version]`
+_VERSION_DASH_RE = re.compile(rf"\s+-\s+(?:[^-]*\b(?:{_VERSION_WORDS})\b).*$", re.IGNORECASE)
+_VERSION_PAREN_RE = re.compile(rf"\s*[(\[][^)\]]*\b(?:{_VERSION_WORDS})\b[^)\]]*[)\]]", re.IGNORECASE)
+
+# Romanization spellings that vary for the same Indic sound, folded before comparing artist names
+_TRANSLIT_FOLDS = (
+    ("aa", "a"), ("ee", "i"), ("ii", "i"), ("oo", "u"), ("uu", "u"), ("ph", "f"), ("w", "v"), ("z", "j"),
+    ("q", "k"), ("y", "i"), ("sh", "s"), ("kh", "k"), ("gh", "g"), ("ch", "c"), ("jh", "j"), ("th", "t"),
+    ("dh", "d"), ("bh", "b"),
+)
+
+
+class QueryVariant(NamedTuple):
+    name: str
+    title: str
+    artist: str
+    # Title-only queries match too broadly; their hits must come from one of the track's artists
+    require_artist: bool = False
+
+
+def normalize_text(text: str | None) -> str:
+    """NFKC + casefold, punctuation/symbols to spaces, whitespace collapsed."""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = "".join(" " if unicodedata.category(ch)[0] in "PSZC" else ch for ch in text)
+    return " ".join(text.split())
+
+
+def normalize_key(title: str | None, artist: str | None) -> str:
+    """Stable key for one (title, primary artist) lookup."""
+    return f"{normalize_text(title)}\x1f{normalize_text(artist)}"
+
+
+def film_name(title: str) -> str | None:
+    """The film in `Song (From "Film")` / `Song - From "Film"` titles, else None."""
+    m = _FILM_RE.search(title or "")
+    return m.group("film").strip() if m else None
+
+
+def clean_title(title: str) -> str:
+    """Strip film credits, featured artists and remaster/version suffixes; falls back to the raw title."""
+    cleaned = _FILM_RE.sub("", title or "")
+    cleaned = _FEAT_RE.sub("", cleaned)
+    cleaned = _VERSION_PAREN_RE.sub("", cleaned)
+    cleaned = _VERSION_DASH_RE.sub("", cleaned)
+    cleaned = " ".join(cleaned.split()).strip(" -")
+    return cleaned or (title or "").strip()
+
+
+def lyrics_key(title: str | None, artist: str | None) -> str:
+    """normalize_key() on the cleaned title, so remasters and film-credited releases share a key."""
+    return normalize_key(clean_title(title or ""), artist)
+
+
+def split_artists(artists: str | None) -> list[str]:
+    return [a.strip() for a in (artists or "").split(",") if a.strip()]
+
+
+def primary_artist(artists: str | None) -> str:
+    """First of the comma-separated `artists`, or "" when there is none."""
+    names = split_artists(artists)
+    return names[0] if names else ""
+
+
+def query_variants(title: str, artists: str | None) -> list[QueryVariant]:
+    """
+    Candidate Genius queries for one track, in default rank order, de-duplicated by normalized key:
+    raw (as Spotify has it), clean (suffixes stripped), film (clean title + film name),
+    second_artist (soundtracks often list the composer first), title_only (artist-checked).
+    """
+    names = split_artists(artists)
+    primary = names[0] if names else ""
+    clean = clean_title(title)
+    film = film_name(title)
+    candidates = [
+        QueryVariant("raw", title, primary),
+        QueryVariant("clean", clean, primary),
+        QueryVariant("film", clean, film) if film else None,
+        QueryVariant("second_artist", clean, names[1]) if len(names) > 1 else None,
+        QueryVariant("title_only", clean, "", require_artist=True) if names else None,
+    ]
+    seen: set[str] = set()
+    variants = []
+    for v in candidates:
+        if v is None:
+            continue
+        key = normalize_key(v.title, v.artist)
+        if key not in seen:
+            seen.add(key)
+            variants.append(v)
+    return variants
+
+
+def _artist_skeleton(name: str) -> str:
+    s = normalize_text(name).replace(" ", "")
+    for a, b in _TRANSLIT_FOLDS:
+        s = s.replace(a, b)
+    return re.sub(r"(.)\1+", r"\1", s)
+
+
+def artist_matches(candidate: str | None, artists: str | None) -> bool | None:
+    """
+    Whether `candidate` (e.g. a Genius primary artist) is one of the comma-separated `artists`,
+    ignoring case, spacing, punctuation and common romanization differences (Shreya Goshal /
+    Ghoshal, A.R. Rahman / AR Rahman). None when it can't be judged (a name is not in Latin script).
+    """
+    names = split_artists(artists)
+    if not candidate or not names:
+        return None
+    if not (candidate.isascii() and all(n.isascii() for n in names)):
+        return None
+    cand = _artist_skeleton(candidate)
+    for name in names:
+        skel = _artist_skeleton(name)
+        if not cand or not skel:
+            continue
+        shorter, longer = sorted((cand, skel), key=len)
+        if shorter == longer or (len(shorter) >= 4 and shorter in longer):
+            return True
+    return False
+
+
+def titles_match(a: str | None, b: str | None) -> bool:
+    return normalize_text(clean_title(a or "")) == normalize_text(clean_title(b or ""))
+
+
+class VariantStats:
+    """
+    Thread-safe per-variant attempt/hit counters, seeded from persisted totals. rank() orders variants
+    by smoothed hit rate (hits + 1) / (attempts + 2), keeping the default order for ties and for
+    variants without data. pending() returns the increments not yet persisted.
+    """
+
+    def __init__(self, totals: dict[str, tuple[int, int]] | None = None):
+        self._totals = dict(totals or {})
+        self._pending: dict[str, tuple[int, int]] = {}
+        self._lock = threading.Lock()
+
+    def rate(self, name: str) -> float:
+        attempts, hits = self._totals.get(name, (0, 0))
+        return (hits + 1) / (attempts + 2)
+
+    def rank(self, variants: list[QueryVariant]) -> list[QueryVariant]:
+        with self._lock:
+            return sorted(variants, key=lambda v: -self.rate(v.name))
+
+    def record(self, name: str, hit: bool) -> None:
+        with self._lock:
+            for counts in (self._totals, self._pending):
+                attempts, hits = counts.get(name, (0, 0))
+                counts[name] = (attempts + 1, hits + int(hit))
+
+    def pending(self) -> dict[str, tuple[int, int]]:
+        """Pop (attempts, hits) increments recorded since the last call."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            return pending
+
+    def snapshot(self) -> dict[str, str]:
+        with self._lock:
+            return {name: f"{hits}/{attempts}" for name, (attempts, hits) in sorted(self._totals.items())}
@@ -0,0 +1,265 @@
+"""
+Pluggable lyrics sources for stage 2.
+- LyricsProvider: the interface (fetch(title, artists) -> LyricsResult); Genius lives in main.py.
+- FallbackChain: tries providers in order (e.g. cache -> local corpus -> Genius).
+- CacheProvider, LocalCorpusProvider: local sources; StubProvider: deterministic offline source for benchmarks.
+- iter_corpus(): corpus parsing (directory of .txt/.lrc files or JSONL), shared with `main.py import-lyrics`.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import time
+from typing import Iterator, NamedTuple, Protocol
+
+from lyrics_normalize import artist_matches, clean_title, lyrics_key, normalize_text, primary_artist, split_artists
+from response_cache import MISS, ResponseCache
+
+
+class LyricsResult(NamedTuple):
+    lyrics: str | None
+    # 'found', 'not_found' (a definitive answer), 'error' (try again soon) or 'skipped' (no provider could judge)
+    outcome: str
+    provider: str
+
+
+class LyricsProvider(Protocol):
+    name: str
+    # Whether a miss from this provider means "no lyrics exist" (Genius) or only "not here" (cache, corpus)
+    authoritative: bool
+
+    def fetch(self, title: str, artists: str) -> LyricsResult: ...
+
+
+class FallbackChain:
+    """
+    Ask providers in order and return the first lyrics found. Found lyrics are handed to earlier
+    providers that can store them (CacheProvider). Without a hit, the outcome is 'error' if any
+    provider failed, 'not_found' if an authoritative provider answered, else 'skipped'.
+    Providers are called from worker threads and must be thread-safe.
+    """
+
+    name = "chain"
+    authoritative = True
+
+    def __init__(self, providers: list[LyricsProvider]):
+        self.providers = list(providers)
+
+    def fetch(self, title: str, artists: str) -> LyricsResult:
+        outcome = "skipped"
+        for i, provider in enumerate(self.providers):
+            result = provider.fetch(title, artists)
+            if result.outcome == "found":
+                for earlier in self.providers[:i]:
+                    store = getattr(earlier, "store", None)
+                    if store is not None:
+                        store(title, artists, result)
+                return result
+            if result.outcome == "error":
+                outcome = "error"
+            elif outcome == "skipped" and provider.authoritative and result.outcome == "not_found":
+                outcome = "not_found"
+        return LyricsResult(None, outcome, self.name)
+
+
+class CacheProvider:
+    """Final lyrics per lyrics_key(title, primary artist), in the on-disk ResponseCache; misses are not cached."""
+
+    name = "cache"
+    authoritative = False
+
+    def __init__(self, cache: ResponseCache):
+        self.cache = cache
+
+    @staticmethod
+    def _key(title: str, artists: str) -> str:
+        return "lyrics_result:" + lyrics_key(title, primary_artist(artists))
+
+    def fetch(self, title: str, artists: str) -> LyricsResult:
+        lyrics = self.cache.get(self._key(title, artists))
+        if lyrics is MISS or not lyrics:
+            return LyricsResult(None, "not_found", self.name)
+        return LyricsResult(lyrics, "found", self.name)
+
+    def store(self, title: str, artists: str, result: LyricsResult) -> None:
+        self.cache.put(self._key(title, artists), result.lyrics)
+
+
+# -----------------------------------------------------------------------------
+# Local corpus
+# -----------------------------------------------------------------------------
+class CorpusEntry(NamedTuple):
+    lyrics: str
+    title: str = ""
+    artist: str = ""
+    track_id: str = ""
+    isrc: str = ""
+    source: str = ""
+
+
+_LRC_TIMESTAMP = re.compile(r"\[\d{1,3}:\d{2}(?:[.:]\d{1,3})?\]")
+_LRC_TAG = re.compile(r"^\[(?P<tag>[a-zA-Z]+):(?P<value>.*)\]\s*$")
+_SPOTIFY_ID = re.compile(r"^[0-9A-Za-z]{22}$")
+_ISRC = re.compile(r"^[A-Z]{2}[A-Z0-9]{3}\d{7}$")
+
+
+def parse_lrc(text: str) -> tuple[str, dict[str, str]]:
+    """(plain lyrics, tags such as ti/ar/isrc) from LRC text: timestamps and empty lines dropped."""
+    tags: dict[str, str] = {}
+    lines = []
+    for line in text.splitlines():
+        m = _LRC_TAG.match(line.strip())
+        if m and not _LRC_TIMESTAMP.match(line.strip()):
+            tags[m.group("tag").lower()] = m.group("value").strip()
+            continue
+        line = _LRC_TIMESTAMP.sub("", line).strip()
+        if line:
+            lines.append(line)
+    return "\n".join(lines), tags
+
+
+def _entry_from_file(path: str) -> CorpusEntry | None:
+    with open(path, encoding="utf-8", errors="replace") as f:
+        text = f.read()
+    stem = os.path.splitext(os.path.basename(path))[0]
+    tags: dict[str, str] = {}
+    if path.lower().endswith(".lrc"):
+        text, tags = parse_lrc(text)
+    lyrics = text.strip()
+    if not lyrics:
+        return None
+    track_id = stem if _SPOTIFY_ID.match(stem) else ""
+    isrc = tags.get("isrc", "").upper() or (stem.upper() if _ISRC.match(stem.upper()) else "")
+    title, artist = tags.get("ti", ""), tags.get("ar", "")
+    if not title and not track_id and not isrc:
+        # File name convention: "Artist - Title"
+        artist, sep, title = stem.partition(" - ")
+        if not sep:
+            artist, title = "", stem
+    return CorpusEntry(lyrics, title.strip(), artist.strip(), track_id, isrc, path)
+
+
+def _entry_from_json(obj: dict, source: str) -> CorpusEntry | None:
+    lyrics = obj.get("lyrics") or obj.get("text") or ""
+    if isinstance(lyrics, str) and _LRC_TIMESTAMP.search(lyrics):
+        lyrics = parse_lrc(lyrics)[0]
+    lyrics = (lyrics or "").strip()
+    if not lyrics:
+        return None
+    artist = obj.get("artist") or obj.get("artists") or ""
+    if isinstance(artist, list):
+        artist = ", ".join(str(a) for a in artist)
+    return CorpusEntry(
+        lyrics,
+        str(obj.get("title") or obj.get("name") or "").strip(),
+        str(artist).strip(),
+        str(obj.get("track_id") or obj.get("id") or "").strip(),
+        str(obj.get("isrc") or "").strip().upper(),
+        source,
+    )
+
+
+def iter_corpus(path: str) -> Iterator[CorpusEntry]:
+    """
+    Stream lyrics entries from a directory tree of .txt/.lrc files or a JSONL file, one at a time.
+    Files: "<Spotify track id>.txt", "<ISRC>.lrc" or "Artist - Title.txt"; LRC [ti:]/[ar:]/[isrc:] tags
+    win over the file name. JSONL: one object per line with lyrics plus any of track_id, isrc,
+    title (or name), artist (or artists, string or list).
+    """
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for fname in sorted(files):
+                if fname.lower().endswith((".txt", ".lrc")):
+                    entry = _entry_from_file(os.path.join(root, fname))
+                    if entry is not None:
+                        yield entry
+        return
+    with open(path, encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                obj = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(obj, dict):
+                entry = _entry_from_json(obj, f"{path}:{lineno}")
+                if entry is not None:
+                    yield entry
+
+
+class LocalCorpusProvider:
+    """
+    Lyrics from a local corpus (see iter_corpus()), loaded into memory once. Matches on
+    lyrics_key(title, primary artist), then on the cleaned title with a transliteration-insensitive
+    artist check.
+    """
+
+    name = "corpus"
+    authoritative = False
+
+    def __init__(self, path: str):
+        self.path = path
+        self._by_key: dict[str, str] = {}
+        self._by_title: dict[str, list[tuple[str, str]]] = {}
+        for entry in iter_corpus(path):
+            if not entry.title:
+                continue
+            self._by_key.setdefault(lyrics_key(entry.title, primary_artist(entry.artist)), entry.lyrics)
+            self._by_title.setdefault(normalize_text(clean_title(entry.title)), []).append((entry.artist, entry.lyrics))
+
+    def __len__(self) -> int:
+        return len(self._by_key)
+
+    def fetch(self, title: str, artists: str) -> LyricsResult:
+        lyrics = self._by_key.get(lyrics_key(title, primary_artist(artists)))
+        if lyrics is None:
+            for artist, candidate in self._by_title.get(normalize_text(clean_title(title)), ()):
+                if any(artist_matches(a, artists) for a in split_artists(artist)):
+                    lyrics = candidate
+                    break
+        if lyrics is None:
+            return LyricsResult(None, "not_found", self.name)
+        return LyricsResult(lyrics, "found", self.name)
+
+
+# -----------------------------------------------------------------------------
+# Offline stub
+# -----------------------------------------------------------------------------
+_STUB_WORDS = (
+    "dil", "tere", "bina", "pyaar", "sapne", "raat", "chand", "yaad", "mera", "tum", "hi", "ho",
+    "kaadhal", "nenjam", "prema", "manasu", "hrudaya", "oru", "naan", "ninna", "jeevan", "saathiya",
+)
+
+
+class StubProvider:
+    """
+    Deterministic offline LyricsProvider for benchmarks and load tests. Each (title, artists) hashes to
+    a fixed verdict: 'error' with probability error_rate, 'not_found' with miss_rate, else 'found' with
+    synthetic romanized lyrics. Every call sleeps latency_s * (0.5..1.5), also derived from the hash.
+    """
+
+    name = "stub"
+    authoritative = True
+
+    def __init__(self, latency_s: float = 0.1, error_rate: float = 0.0, miss_rate: float = 0.2):
+        self.latency_s = latency_s
+        self.error_rate = error_rate
+        self.miss_rate = miss_rate
+
+    def fetch(self, title: str, artists: str) -> LyricsResult:
+        digest = hashlib.sha1(f"{title}\x1f{artists}".encode("utf-8")).digest()
+        u_error, u_miss, u_latency = (int.from_bytes(digest[i : i + 4], "big") / 2**32 for i in (0, 4, 8))
+        if self.latency_s > 0:
+            time.sleep(self.latency_s * (0.5 + u_latency))
+        if u_error < self.error_rate:
+            return LyricsResult(None, "error", self.name)
+        if u_miss < self.miss_rate:
+            return LyricsResult(None, "not_found", self.name)
+        words = [_STUB_WORDS[b % len(_STUB_WORDS)] for b in digest]
+        lines = [" ".join(words[i : i + 5]) for i in range(0, len(words), 5)]
+        return LyricsResult("\n".join(lines), "found", self.name)
@@ -5,21 +5,69 @@ Uses Spotify API, Genius lyrics, and AI4Bharat IndicLID. Resume-safe via SQLite.
 """
 from __future__ import annotations
 
+import argparse
+import hashlib
+import itertools
 import json
 import logging
 import os
+import queue
+import re
+import signal
 import sqlite3
+import struct
+import threading
 import time
+import zlib
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from typing import Iterable, Iterator
 
 from dotenv import load_dotenv
 
 load_dotenv()
 
 import pandas as pd
+import requests
 import spotipy
+from spotipy.exceptions import SpotifyException
 from spotipy.oauth2 import SpotifyOAuth
 from tqdm import tqdm
 
+from lid_scores import aggregate_line_scores
+from lyrics_providers import (
+    CacheProvider,
+    FallbackChain,
+    LocalCorpusProvider,
+    LyricsProvider,
+    LyricsResult,
+    StubProvider,
+    iter_corpus,
+)
+from lyrics_normalize import (
+    QueryVariant,
+    VariantStats,
+    artist_matches,
+    clean_title,
+    lyrics_key,
+    normalize_key,
+    normalize_text,
+    primary_artist,
+    query_variants,
+    split_artists,
+    titles_match,
+)
+from ratelimit import AdaptiveRateLimiter, AIMDPacer, backoff_delay, retry_after_seconds
+from response_cache import MISS, ResponseCache
+
+try:
+    import zstandard as _zstd
+except ImportError:
+    _zstd = None
+
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
 # -----------------------------------------------------------------------------
 # Config (env vars preferred for cluster runs)
 # -----------------------------------------------------------------------------
@@ -31,10 +79,55 @@ CONFIG = {
     "confidence_review_max": float(os.environ.get("CONFIDENCE_REVIEW_MAX", "0.7")),
     "genius_delay": float(os.environ.get("GENIUS_DELAY", "1.2")),
     "genius_max_retries": int(os.environ.get("GENIUS_MAX_RETRIES", "5")),
+    "genius_workers": int(os.environ.get("GENIUS_WORKERS", "4")),
+    "genius_rate": float(os.environ.get("GENIUS_RATE", "4")),
+    "genius_rate_max": float(os.environ.get("GENIUS_RATE_MAX", "8")),
+    "genius_cache_path": os.environ.get("GENIUS_CACHE_PATH", "genius_cache.db"),
+    "genius_cache_ttl_days": float(os.environ.get("GENIUS_CACHE_TTL_DAYS", "90")),
+    "genius_cache_max_mb": float(os.environ.get("GENIUS_CACHE_MAX_MB", "512")),
+    "lyrics_query_variants": int(os.environ.get("LYRICS_QUERY_VARIANTS", "4")),
+    # Stage-2 lyrics sources, tried in this order (cache, corpus, genius, stub)
+    "lyrics_providers": os.environ.get("LYRICS_PROVIDERS", "cache,corpus,genius"),
+    "lyrics_corpus": os.environ.get("LYRICS_CORPUS"),
+    "lyrics_stub_latency_ms": float(os.environ.get("LYRICS_STUB_LATENCY_MS", "100")),
+    "lyrics_stub_error_rate": float(os.environ.get("LYRICS_STUB_ERROR_RATE", "0")),
+    "lyrics_stub_miss_rate": float(os.environ.get("LYRICS_STUB_MISS_RATE", "0.2")),
+    # Lyrics re-attempt schedule: the wait doubles after every unsuccessful attempt, up to the max
+    "lyrics_retry_not_found_hours": float(os.environ.get("LYRICS_RETRY_NOT_FOUND_HOURS", "168")),
+    "lyrics_retry_error_hours": float(os.environ.get("LYRICS_RETRY_ERROR_HOURS", "1")),
+    "lyrics_retry_max_hours": float(os.environ.get("LYRICS_RETRY_MAX_HOURS", "4320")),
     "spotify_batch_size": 100,
     "needs_review_csv": "needs_review.csv",
     "songs_csv": os.environ.get("SPOTIFY_SONGS_CSV", "indian_songs.csv"),
     "model_dir": os.environ.get("INDICLID_MODEL_DIR"),
+    "db_profile": os.environ.get("SPOTIFY_LID_DB_PROFILE", "durable"),
+    "db_page_size": int(os.environ.get("SPOTIFY_LID_DB_PAGE_SIZE", "500")),
+    "db_write_batch": int(os.environ.get("DB_WRITE_BATCH", "500")),
+    "db_write_interval_ms": int(os.environ.get("DB_WRITE_INTERVAL_MS", "2000")),
+    "db_write_queue": int(os.environ.get("DB_WRITE_QUEUE", "1000")),
+    "full_sync_days": float(os.environ.get("SPOTIFY_FULL_SYNC_DAYS", "7")),
+    "spotify_workers": int(os.environ.get("SPOTIFY_WORKERS", "4")),
+    "spotify_max_retries": int(os.environ.get("SPOTIFY_MAX_RETRIES", "5")),
+}
+
+# SQLite connection profiles (SPOTIFY_LID_DB_PROFILE). Pragmas are applied in order on every new connection.
+# durable: rollback journal + full fsync (SQLite defaults), only adds a busy timeout.
+# throughput: WAL so readers (CSV export) don't block the writer, NORMAL sync (safe in WAL mode,
+# only the last commits can be lost on power failure), 256 MiB mmap, 64 MiB page cache, in-memory temp tables.
+DB_PROFILES = {
+    "durable": {
+        "busy_timeout": 30000,
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+    },
+    "throughput": {
+        "busy_timeout": 30000,
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64 * 1024,
+        "temp_store": "MEMORY",
+    },
 }
 
 # One playlist per language; each language can have multiple script codes (native + Latin/romanized).
@@ -68,16 +161,19 @@ def init_db(conn: sqlite3.Connection) -> None:
             name TEXT,
             artists TEXT,
             added_at TEXT,
-            lyrics TEXT,
             lid_lang TEXT,
             lid_confidence REAL,
             lid_model TEXT,
             status TEXT DEFAULT 'pending',
             languages TEXT,
-            language_confidences TEXT
+            language_confidences TEXT,
+            lyrics_hash TEXT,
+            lyrics_state TEXT DEFAULT 'missing',
+            lyrics_attempts INTEGER NOT NULL DEFAULT 0,
+            last_attempt_at TEXT,
+            lyrics_outcome TEXT,
+            isrc TEXT
         );
-        CREATE INDEX IF NOT EXISTS idx_tracks_status ON tracks(status);
-        CREATE INDEX IF NOT EXISTS idx_tracks_lyrics ON tracks(lyrics);
     """)
     # Migration: add new columns if table already existed
     cur = conn.cursor()
@@ -87,11 +183,245 @@ def init_db(conn: sqlite3.Connection) -> None:
         conn.execute("ALTER TABLE tracks ADD COLUMN languages TEXT")
     if "language_confidences" not in cols:
         conn.execute("ALTER TABLE tracks ADD COLUMN language_confidences TEXT")
+    if "lyrics_state" not in cols:
+        conn.execute("ALTER TABLE tracks ADD COLUMN lyrics_hash TEXT")
+        conn.execute("ALTER TABLE tracks ADD COLUMN lyrics_state TEXT DEFAULT 'missing'")
+        conn.create_function("lyrics_sha1", 1, _lyrics_hash, deterministic=True)
+        conn.execute(
+            """
+            UPDATE tracks SET
+                lyrics_hash = CASE WHEN lyrics != '' THEN lyrics_sha1(lyrics) END,
+                lyrics_state = CASE WHEN lyrics IS NULL THEN 'missing' WHEN lyrics = '' THEN 'empty' ELSE 'present' END
+            """
+        )
+        conn.execute("UPDATE tracks SET language_confidences = NULL WHERE language_confidences = ''")
+    if "lyrics_attempts" not in cols:
+        conn.execute("ALTER TABLE tracks ADD COLUMN lyrics_attempts INTEGER NOT NULL DEFAULT 0")
+        conn.execute("ALTER TABLE tracks ADD COLUMN last_attempt_at TEXT")
+        conn.execute("ALTER TABLE tracks ADD COLUMN lyrics_outcome TEXT")
+        # Earlier runs stored "" for every failed lookup; count that as one not-found attempt now,
+        # so those tracks join the re-attempt schedule instead of being re-queried on every run
+        conn.execute(
+            """
+            UPDATE tracks SET lyrics_attempts = 1, lyrics_outcome = 'not_found',
+                last_attempt_at = strftime('%Y-%m-%dT%H:%M:%S', 'now')
+            WHERE lyrics_state = 'empty'
+            """
+        )
+        conn.execute("UPDATE tracks SET lyrics_outcome = 'found' WHERE lyrics_state = 'present'")
+    if "isrc" not in cols:
+        # Filled in by the next sync that sees each track (a --full-sync covers the whole library)
+        conn.execute("ALTER TABLE tracks ADD COLUMN isrc TEXT")
+    # Per-language confidences, normalized out of the language_confidences JSON so playlist
+    # selection is an indexed range scan on (lang_code, confidence) instead of json.loads per row.
+    has_track_languages = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'track_languages'"
+    ).fetchone()
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS track_languages (
+            track_id TEXT NOT NULL,
+            lang_code TEXT NOT NULL,
+            confidence REAL NOT NULL,
+            PRIMARY KEY (track_id, lang_code)
+        );
+        CREATE INDEX IF NOT EXISTS idx_track_languages_lang ON track_languages(lang_code, confidence, track_id);
+        -- reclassify(): per-track threshold probes and best-language lookup (rowid breaks ties in key order)
+        CREATE INDEX IF NOT EXISTS idx_track_languages_track ON track_languages(track_id, confidence DESC);
+    """)
+    if not has_track_languages:
+        conn.execute(
+            """
+            INSERT INTO track_languages (track_id, lang_code, confidence)
+            SELECT t.track_id, j.key, j.value
+            FROM tracks t, json_each(t.language_confidences) j
+            WHERE t.language_confidences IS NOT NULL AND json_valid(t.language_confidences)
+            ORDER BY t.rowid, j.id
+            """
+        )
+    # Lyrics live in their own content-addressed table (tracks.lyrics_hash -> lyrics.hash), compressed,
+    # so scans of tracks never drag lyric pages through the cache and identical lyrics are stored once.
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS lyrics (
+            hash TEXT PRIMARY KEY,
+            body BLOB NOT NULL
+        );
+    """)
+    if "lyrics" in cols:
+        # The old full-text B-tree over lyric bodies roughly doubled the DB
+        conn.execute("DROP INDEX IF EXISTS idx_tracks_lyrics")
+    if "lyrics" in cols and conn.execute("SELECT 1 FROM tracks WHERE lyrics IS NOT NULL LIMIT 1").fetchone():
+        # Legacy DB with inline lyrics: move them out and drop the column
+        conn.create_function("lyrics_compress", 1, compress_lyrics, deterministic=True)
+        conn.execute(
+            """
+            INSERT OR IGNORE INTO lyrics (hash, body)
+            SELECT lyrics_hash, lyrics_compress(lyrics) FROM tracks
+            WHERE lyrics_state = 'present' AND lyrics IS NOT NULL
+            """
+        )
+        try:
+            conn.execute("ALTER TABLE tracks DROP COLUMN lyrics")
+        except sqlite3.OperationalError:
+            # SQLite < 3.35 has no DROP COLUMN; the column stays but is no longer read or written
+            conn.execute("UPDATE tracks SET lyrics = NULL")
+        conn.commit()
+        logger.info("Moved inline lyrics to the compressed lyrics table; vacuuming %s...", CONFIG["db_path"])
+        conn.execute("VACUUM")
+    # Raw per-line LID output, one packed blob per track (see pack_line_scores()), so aggregates and
+    # statuses can be recomputed after a threshold/rule change without re-running the model.
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS lid_langs (
+            lang_id INTEGER PRIMARY KEY,
+            lang_code TEXT NOT NULL UNIQUE
+        );
+        CREATE TABLE IF NOT EXISTS lid_line_scores (
+            track_id TEXT PRIMARY KEY,
+            scores BLOB NOT NULL
+        );
+    """)
+    # Resolved per-language playlists: Spotify ID, snapshot_id of our last write, hash of the membership we wrote
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS playlists (
+            name TEXT PRIMARY KEY,
+            playlist_id TEXT NOT NULL,
+            snapshot_id TEXT,
+            membership_hash TEXT,
+            updated_at TEXT
+        );
+    """)
+    # Small key/value store for sync bookkeeping (liked-songs watermark, last full sync time)
+    conn.execute("CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT)")
+    # Genius hit rate per query variant (lyrics_normalize.query_variants()); variants are tried best-first
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS variant_stats (
+            variant TEXT PRIMARY KEY,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            hits INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    # Work-queue indexes are partial: they only hold rows still waiting for lyrics / LID, shaped
+    # exactly like the WHERE clauses of iter_tracks_missing_lyrics() and iter_tracks_missing_lid().
+    # Every column those queries read, including the partial-index filter columns, is in the key:
+    # SQLite only treats an index as covering when it holds all referenced columns.
+    conn.executescript("""
+        CREATE INDEX IF NOT EXISTS idx_tracks_status ON tracks(status);
+        CREATE INDEX IF NOT EXISTS idx_tracks_isrc ON tracks(isrc) WHERE isrc IS NOT NULL;
+        DROP INDEX IF EXISTS idx_tracks_lyrics_todo;
+        CREATE INDEX IF NOT EXISTS idx_tracks_lyrics_queue
+            ON tracks(track_id, status, name, artists, added_at, lyrics_state, last_attempt_at, lyrics_attempts, lyrics_outcome)
+            WHERE lyrics_state != 'present';
+        DROP INDEX IF EXISTS idx_tracks_lid_todo;
+        DROP INDEX IF EXISTS idx_tracks_lid_queue;
+        CREATE INDEX IF NOT EXISTS idx_tracks_lid_pending
+            ON tracks(track_id, lyrics_hash, status, lyrics_state, language_confidences)
+            WHERE lyrics_state = 'present' AND language_confidences IS NULL;
+    """)
     conn.commit()
 
 
-def get_conn() -> sqlite3.Connection:
-    return sqlite3.connect(CONFIG["db_path"])
+def _lyrics_hash(lyrics: str) -> str:
+    return hashlib.sha1(lyrics.encode("utf-8")).hexdigest()
+
+
+def compress_lyrics(lyrics: str) -> bytes:
+    """zstd when the optional zstandard package is installed, zlib otherwise."""
+    data = lyrics.encode("utf-8")
+    if _zstd is not None:
+        return _zstd.ZstdCompressor(level=10).compress(data)
+    return zlib.compress(data, 9)
+
+
+def decompress_lyrics(body: bytes) -> str:
+    """Inverse of compress_lyrics(); the codec is recognized from the zstd frame magic."""
+    if body[:4] == _ZSTD_MAGIC:
+        if _zstd is None:
+            raise RuntimeError("Lyrics were stored with zstd; install the zstandard package to read them.")
+        return _zstd.ZstdDecompressor().decompress(body).decode("utf-8")
+    return zlib.decompress(body).decode("utf-8")
+
+
+def _store_lyrics(conn: sqlite3.Connection, lyrics_by_hash: dict[str, str]) -> None:
+    """Insert lyric bodies not already stored (content-addressed, so duplicates are free)."""
+    if not lyrics_by_hash:
+        return
+    known = set()
+    hashes = list(lyrics_by_hash)
+    for i in range(0, len(hashes), 500):
+        chunk = hashes[i : i + 500]
+        placeholders = ", ".join("?" for _ in chunk)
+        known.update(row[0] for row in conn.execute(f"SELECT hash FROM lyrics WHERE hash IN ({placeholders})", chunk))
+    conn.executemany(
+        "INSERT OR IGNORE INTO lyrics (hash, body) VALUES (?, ?)",
+        [(h, compress_lyrics(text)) for h, text in lyrics_by_hash.items() if h not in known],
+    )
+
+
+def get_conn(profile: str | None = None) -> sqlite3.Connection:
+    """Open the progress DB and apply the pragmas of the configured profile (see DB_PROFILES)."""
+    profile = profile or CONFIG["db_profile"]
+    if profile not in DB_PROFILES:
+        raise ValueError(f"Unknown SQLite profile {profile!r}; choose one of {sorted(DB_PROFILES)}")
+    conn = sqlite3.connect(CONFIG["db_path"])
+    for pragma, value in DB_PROFILES[profile].items():
+        conn.execute(f"PRAGMA {pragma}={value}")
+    return conn
+
+
+def get_db_settings(conn: sqlite3.Connection) -> dict[str, object]:
+    """Effective values of the profile pragmas on this connection (for logging)."""
+    pragmas = {p for settings in DB_PROFILES.values() for p in settings}
+    return {p: conn.execute(f"PRAGMA {p}").fetchone()[0] for p in sorted(pragmas)}
+
+
+_UPSERT_TRACK_SQL = """
+    INSERT INTO tracks (
+        track_id, name, artists, added_at, lyrics_hash, lyrics_state, lid_lang, lid_confidence, lid_model, status,
+        lyrics_outcome, lyrics_attempts, last_attempt_at, isrc
+    )
+    VALUES (?, ?, ?, ?, ?, COALESCE(?, 'missing'), ?, ?, ?, COALESCE(?, 'pending'), ?, ?, ?, ?)
+    ON CONFLICT(track_id) DO UPDATE SET
+        name = excluded.name,
+        artists = excluded.artists,
+        added_at = excluded.added_at,
+        lyrics_hash = CASE WHEN ? IS NULL THEN lyrics_hash ELSE excluded.lyrics_hash END,
+        lyrics_state = CASE WHEN ? IS NULL THEN lyrics_state ELSE excluded.lyrics_state END,
+        lid_lang = COALESCE(excluded.lid_lang, lid_lang),
+        lid_confidence = COALESCE(excluded.lid_confidence, lid_confidence),
+        lid_model = COALESCE(excluded.lid_model, lid_model),
+        status = COALESCE(?, CASE WHEN status = 'unliked' THEN 'pending' ELSE status END),
+        lyrics_outcome = COALESCE(excluded.lyrics_outcome, lyrics_outcome),
+        lyrics_attempts = lyrics_attempts + excluded.lyrics_attempts,
+        last_attempt_at = COALESCE(excluded.last_attempt_at, last_attempt_at),
+        isrc = COALESCE(excluded.isrc, isrc)
+"""
+
+
+def _upsert_params(
+    track_id: str,
+    name: str,
+    artists: str,
+    added_at: str,
+    lyrics: str | None = None,
+    lid_lang: str | None = None,
+    lid_confidence: float | None = None,
+    lid_model: str | None = None,
+    status: str | None = None,
+    lyrics_outcome: str | None = None,
+    isrc: str | None = None,
+) -> tuple:
+    if lyrics is None:
+        lyrics_hash, lyrics_state = None, None
+    elif lyrics:
+        lyrics_hash, lyrics_state = _lyrics_hash(lyrics), "present"
+    else:
+        lyrics_hash, lyrics_state = None, "empty"
+    # A lyrics_outcome records one Genius attempt
+    attempted_at = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S") if lyrics_outcome else None
+    return (
+        track_id, name, artists, added_at, lyrics_hash, lyrics_state,
+        lid_lang, lid_confidence, lid_model, status, lyrics_outcome, 1 if lyrics_outcome else 0, attempted_at,
+        isrc, lyrics_state, lyrics_state, status,
+    )
 
 
 def upsert_track(
@@ -106,49 +436,39 @@ def upsert_track(
     lid_model: str | None = None,
     status: str | None = None,
 ) -> None:
-    cur = conn.cursor()
-    cur.execute(
-        """
-        INSERT INTO tracks (track_id, name, artists, added_at, lyrics, lid_lang, lid_confidence, lid_model, status)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, status))
-        ON CONFLICT(track_id) DO UPDATE SET
-            name = excluded.name,
-            artists = excluded.artists,
-            added_at = excluded.added_at,
-            lyrics = COALESCE(excluded.lyrics, lyrics),
-            lid_lang = COALESCE(excluded.lid_lang, lid_lang),
-            lid_confidence = COALESCE(excluded.lid_confidence, lid_confidence),
-            lid_model = COALESCE(excluded.lid_model, lid_model),
-            status = COALESCE(excluded.status, status)
-        """,
-        (
-            track_id,
-            name,
-            artists,
-            added_at,
-            lyrics,
-            lid_lang,
-            lid_confidence,
-            lid_model,
-            status,
-        ),
+    if lyrics:
+        _store_lyrics(conn, {_lyrics_hash(lyrics): lyrics})
+    conn.execute(
+        _UPSERT_TRACK_SQL,
+        _upsert_params(track_id, name, artists, added_at, lyrics, lid_lang, lid_confidence, lid_model, status),
     )
     conn.commit()
 
 
-def update_language_result(
-    conn: sqlite3.Connection,
-    track_id: str,
-    language_confidences: dict[str, float],
-) -> None:
-    """Store per-language confidences and set status from thresholds."""
+def bulk_upsert_tracks(conn: sqlite3.Connection, rows: Iterable[dict]) -> int:
+    """
+    Upsert many tracks in a single transaction (one commit instead of one per row).
+    Each row is a dict with upsert_track() keyword names; same COALESCE semantics.
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+    with conn:
+        _write_tracks(conn, rows)
+    return len(rows)
+
+
+def _write_tracks(conn: sqlite3.Connection, rows: list[dict]) -> None:
+    """Upsert a batch of track dicts (and their lyrics) with executemany; the caller owns the transaction."""
+    lyrics_by_hash = {_lyrics_hash(row["lyrics"]): row["lyrics"] for row in rows if row.get("lyrics")}
+    _store_lyrics(conn, lyrics_by_hash)
+    conn.executemany(_UPSERT_TRACK_SQL, [_upsert_params(**row) for row in rows])
+
+
+def classify_language_confidences(language_confidences: dict[str, float]) -> tuple[list[str], str, float, str]:
+    """(languages, best_lang, best_conf, status) for one track's per-language confidences."""
     if not language_confidences:
-        conn.execute(
-            "UPDATE tracks SET languages=?, language_confidences=?, lid_lang=?, lid_confidence=?, status=? WHERE track_id=?",
-            ("[]", "{}", "other", 0.0, "skip", track_id),
-        )
-        conn.commit()
-        return
+        return [], "other", 0.0, "skip"
     # Primary lang for backward compat: best South Asian
     best_lang = max(language_confidences, key=language_confidences.get)
     best_conf = language_confidences[best_lang]
@@ -159,46 +479,518 @@ def update_language_result(
         status = "review"
     else:
         status = "skip"
+    return languages, best_lang, best_conf, status
+
+
+def _write_language_results(conn: sqlite3.Connection, results: list[tuple[str, dict[str, float]]]) -> None:
+    """
+    Write a batch of LID results with executemany; the caller owns the transaction. Unliked tracks
+    keep their status (confidences are still updated, for when the track is liked again).
+    """
+    latest = dict(results)  # a track listed twice keeps its last result
+    empty, found, lang_rows = [], [], []
+    for track_id, language_confidences in latest.items():
+        languages, best_lang, best_conf, status = classify_language_confidences(language_confidences)
+        if not language_confidences:
+            empty.append(("[]", "{}", best_lang, best_conf, status, track_id))
+            continue
+        found.append(
+            (json.dumps(languages), json.dumps(language_confidences), best_lang, best_conf, "IndicLID", status, track_id)
+        )
+        lang_rows.extend((track_id, lang, conf) for lang, conf in language_confidences.items())
+    conn.executemany("DELETE FROM track_languages WHERE track_id = ?", [(tid,) for tid in latest])
+    conn.executemany(
+        """
+        UPDATE tracks SET languages=?, language_confidences=?, lid_lang=?, lid_confidence=?,
+            status=CASE WHEN status = 'unliked' THEN status ELSE ? END
+        WHERE track_id=?
+        """,
+        empty,
+    )
+    conn.executemany(
+        """
+        UPDATE tracks SET languages=?, language_confidences=?, lid_lang=?, lid_confidence=?, lid_model=?,
+            status=CASE WHEN status = 'unliked' THEN status ELSE ? END
+        WHERE track_id=?
+        """,
+        found,
+    )
+    conn.executemany("INSERT INTO track_languages (track_id, lang_code, confidence) VALUES (?, ?, ?)", lang_rows)
+
+
+# Per-line LID record: 8-byte line hash, lang_id (lid_langs), confidence, model stage
+_LINE_SCORE = struct.Struct("<8sHdB")
+_MODEL_STAGES = {"IndicLID-FTN": 0, "IndicLID-FTR": 1, "IndicLID-BERT": 2}
+_MODEL_STAGE_NAMES = {v: k for k, v in _MODEL_STAGES.items()}
+_UNKNOWN_STAGE = 255
+
+
+def _line_hash(line: str) -> bytes:
+    return hashlib.blake2b(line.encode("utf-8"), digest_size=8).digest()
+
+
+def pack_line_scores(line_scores: list[tuple[str, str, float, str]], lang_ids: dict[str, int]) -> bytes:
+    """Pack IndicLIDWrapper.predict_lines() output into a compact blob (19 bytes per line)."""
+    return b"".join(
+        _LINE_SCORE.pack(_line_hash(line), lang_ids[lang], conf, _MODEL_STAGES.get(model, _UNKNOWN_STAGE))
+        for line, lang, conf, model in line_scores
+    )
+
+
+def unpack_line_scores(blob: bytes, lang_codes: dict[int, str]) -> list[tuple[bytes, str, float, str]]:
+    """Inverse of pack_line_scores(): (line_hash, lang_code, confidence, model_name) per line."""
+    return [
+        (line_hash, lang_codes[lang_id], conf, _MODEL_STAGE_NAMES.get(stage, "unknown"))
+        for line_hash, lang_id, conf, stage in _LINE_SCORE.iter_unpack(blob)
+    ]
+
+
+def _lid_lang_ids(conn: sqlite3.Connection, lang_codes: set[str]) -> dict[str, int]:
+    conn.executemany("INSERT OR IGNORE INTO lid_langs (lang_code) VALUES (?)", [(lc,) for lc in lang_codes])
+    return {lc: lang_id for lang_id, lc in conn.execute("SELECT lang_id, lang_code FROM lid_langs")}
+
+
+def _write_line_scores(conn: sqlite3.Connection, rows: list[tuple[str, list[tuple[str, str, float, str]]]]) -> None:
+    """Store per-line LID results for a batch of tracks; the caller owns the transaction."""
+    lang_ids = _lid_lang_ids(conn, {lang for _tid, line_scores in rows for _line, lang, _conf, _model in line_scores})
+    conn.executemany(
+        "INSERT OR REPLACE INTO lid_line_scores (track_id, scores) VALUES (?, ?)",
+        [(track_id, pack_line_scores(line_scores, lang_ids)) for track_id, line_scores in rows],
+    )
+
+
+def _write_lid_results(
+    conn: sqlite3.Connection, rows: list[tuple[str, list[tuple[str, str, float, str]], dict[str, float]]]
+) -> None:
+    """Line scores and aggregated results for a batch of tracks; the caller owns the transaction."""
+    _write_line_scores(conn, [(track_id, line_scores) for track_id, line_scores, _confs in rows])
+    _write_language_results(conn, [(track_id, confs) for track_id, _line_scores, confs in rows])
+
+
+def iter_line_scores(
+    conn: sqlite3.Connection, page_size: int | None = None
+) -> Iterator[tuple[str, list[tuple[bytes, str, float, str]]]]:
+    """Stream (track_id, unpacked per-line scores) for every track that has them, keyset-paged."""
+    page_size = page_size or CONFIG["db_page_size"]
+    lang_codes = {lang_id: lc for lang_id, lc in conn.execute("SELECT lang_id, lang_code FROM lid_langs")}
+    last_id = ""
+    while True:
+        rows = conn.execute(
+            "SELECT track_id, scores FROM lid_line_scores WHERE track_id > ? ORDER BY track_id LIMIT ?",
+            (last_id, page_size),
+        ).fetchall()
+        if not rows:
+            return
+        for track_id, blob in rows:
+            yield track_id, unpack_line_scores(blob, lang_codes)
+        last_id = rows[-1][0]
+
+
+def update_language_result(
+    conn: sqlite3.Connection,
+    track_id: str,
+    language_confidences: dict[str, float],
+) -> None:
+    """Store per-language confidences (JSON + track_languages rows) and set status from thresholds."""
+    _write_language_results(conn, [(track_id, language_confidences)])
+    conn.commit()
+
+
+def _write_unliked(conn: sqlite3.Connection, liked_ids: list[str]) -> None:
+    """
+    Mark every stored track missing from a complete Liked Songs listing as 'unliked', as one
+    set difference against a temp table (no per-row Python). Re-liking a track resets it to
+    'pending' via the upsert; run() then reclassifies it from its stored confidences.
+    """
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS liked_ids (track_id TEXT PRIMARY KEY)")
+    conn.execute("DELETE FROM temp.liked_ids")
+    conn.executemany("INSERT OR IGNORE INTO temp.liked_ids (track_id) VALUES (?)", ((tid,) for tid in liked_ids))
+    cur = conn.execute(
+        """
+        UPDATE tracks SET status = 'unliked'
+        WHERE status != 'unliked'
+            AND NOT EXISTS (SELECT 1 FROM temp.liked_ids l WHERE l.track_id = tracks.track_id)
+        """
+    )
+    conn.execute("DELETE FROM temp.liked_ids")
+    if cur.rowcount:
+        logger.info("Marked %d tracks as unliked.", cur.rowcount)
+
+
+def get_cached_playlist(conn: sqlite3.Connection, name: str) -> tuple[str, str | None, str | None] | None:
+    """(playlist_id, snapshot_id, membership_hash) stored for a playlist title, or None."""
+    return conn.execute(
+        "SELECT playlist_id, snapshot_id, membership_hash FROM playlists WHERE name = ?", (name,)
+    ).fetchone()
+
+
+def save_playlist(
+    conn: sqlite3.Connection, name: str, playlist_id: str, snapshot_id: str | None, membership_hash: str | None
+) -> None:
     conn.execute(
-        "UPDATE tracks SET languages=?, language_confidences=?, lid_lang=?, lid_confidence=?, lid_model=?, status=? WHERE track_id=?",
-        (json.dumps(languages), json.dumps(language_confidences), best_lang, best_conf, "IndicLID", status, track_id),
+        """
+        INSERT INTO playlists (name, playlist_id, snapshot_id, membership_hash, updated_at)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(name) DO UPDATE SET
+            playlist_id = excluded.playlist_id,
+            snapshot_id = excluded.snapshot_id,
+            membership_hash = excluded.membership_hash,
+            updated_at = excluded.updated_at
+        """,
+        (name, playlist_id, snapshot_id, membership_hash, datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")),
     )
     conn.commit()
 
 
-def get_tracks_missing_lyrics(conn: sqlite3.Connection) -> list[tuple[str, str, str, str]]:
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT track_id, name, artists, COALESCE(added_at, '') FROM tracks WHERE (lyrics IS NULL OR lyrics = '') AND status != 'skip'"
+def forget_playlist(conn: sqlite3.Connection, name: str) -> None:
+    conn.execute("DELETE FROM playlists WHERE name = ?", (name,))
+    conn.commit()
+
+
+def membership_hash(track_uris: list[str]) -> str:
+    return hashlib.sha1("\n".join(track_uris).encode("utf-8")).hexdigest()
+
+
+def get_sync_state(conn: sqlite3.Connection, key: str) -> str | None:
+    row = conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def _write_sync_state(conn: sqlite3.Connection, rows: list[tuple[str, str]]) -> None:
+    conn.executemany("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", rows)
+
+
+def get_variant_stats(conn: sqlite3.Connection) -> dict[str, tuple[int, int]]:
+    """variant -> (attempts, hits) accumulated over all runs."""
+    return {variant: (attempts, hits) for variant, attempts, hits in conn.execute("SELECT * FROM variant_stats")}
+
+
+def _write_variant_stats(conn: sqlite3.Connection, rows: list[tuple[str, int, int]]) -> None:
+    """Add (variant, attempts, hits) increments."""
+    conn.executemany(
+        """
+        INSERT INTO variant_stats (variant, attempts, hits) VALUES (?, ?, ?)
+        ON CONFLICT(variant) DO UPDATE SET attempts = attempts + excluded.attempts, hits = hits + excluded.hits
+        """,
+        rows,
     )
-    return cur.fetchall()
 
 
-def get_tracks_missing_lid(conn: sqlite3.Connection) -> list[tuple[str, str]]:
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT track_id, lyrics FROM tracks WHERE lyrics IS NOT NULL AND lyrics != '' AND (language_confidences IS NULL OR language_confidences = '')"
+class DBWriter:
+    """
+    Single background thread that owns the write connection. Stages only enqueue operations
+    (upserts, LID results) on a bounded queue; the thread applies them in one transaction per
+    `batch_size` rows or `max_delay_ms` milliseconds, whichever comes first, so network waits and
+    model compute never serialize with SQLite I/O. A full queue blocks producers (backpressure).
+
+    Use as a context manager: exit drains the queue and commits, including on Ctrl-C and SIGTERM
+    (e.g. a cluster job time limit). flush() waits until everything enqueued so far is committed,
+    which a stage must do before reading back what it wrote through another connection.
+    """
+
+    def __init__(self, batch_size: int | None = None, max_delay_ms: int | None = None, queue_size: int | None = None):
+        self.batch_size = batch_size or CONFIG["db_write_batch"]
+        self.max_delay = (max_delay_ms if max_delay_ms is not None else CONFIG["db_write_interval_ms"]) / 1000
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size or CONFIG["db_write_queue"])
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._error: BaseException | None = None
+        self._prev_sigterm = None
+
+    # -- producer API ---------------------------------------------------------
+    def upsert_tracks(self, rows: list[dict]) -> None:
+        """Same semantics as bulk_upsert_tracks()."""
+        if rows:
+            self._put(("tracks", list(rows)))
+
+    def write_language_result(self, track_id: str, language_confidences: dict[str, float]) -> None:
+        """Same semantics as update_language_result()."""
+        self._put(("lid", [(track_id, language_confidences)]))
+
+    def write_lid_result(
+        self, track_id: str, line_scores: list[tuple[str, str, float, str]], language_confidences: dict[str, float]
+    ) -> None:
+        """Persist IndicLIDWrapper.predict_lines() output and its aggregate for one track, as one op."""
+        self._put(("lid_full", [(track_id, line_scores, language_confidences)]))
+
+    def set_sync_state(self, key: str, value: str) -> None:
+        """Committed in order with the writes enqueued before it (a watermark never runs ahead of its data)."""
+        self._put(("state", [(key, value)]))
+
+    def mark_unliked(self, liked_ids: Iterable[str]) -> None:
+        """Given every currently liked track ID (a full sync), mark all other stored tracks 'unliked'."""
+        self._put(("unliked", list(liked_ids)))
+
+    def add_variant_stats(self, increments: dict[str, tuple[int, int]]) -> None:
+        """Add VariantStats.pending() increments to the persisted per-variant totals."""
+        if increments:
+            self._put(("variant_stats", [(name, attempts, hits) for name, (attempts, hits) in increments.items()]))
+
+    def flush(self) -> None:
+        done = threading.Event()
+        self._put(("barrier", done))
+        done.wait()
+        self._raise_if_failed()
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._raise_if_failed()
+
+    def _put(self, op: tuple) -> None:
+        self._raise_if_failed()
+        self._queue.put(op)
+
+    def _raise_if_failed(self) -> None:
+        if self._error is not None:
+            raise RuntimeError("DB writer thread failed") from self._error
+
+    # -- writer thread --------------------------------------------------------
+    _WRITERS = {
+        "tracks": _write_tracks,
+        "lid": _write_language_results,
+        "lid_full": _write_lid_results,
+        "state": _write_sync_state,
+        "unliked": _write_unliked,
+        "variant_stats": _write_variant_stats,
+    }
+
+    def _run(self) -> None:
+        conn = get_conn()
+        try:
+            stop = False
+            while not stop:
+                batch = [self._queue.get()]
+                rows = len(batch[0][1]) if batch[0] and batch[0][0] != "barrier" else 0
+                deadline = time.monotonic() + self.max_delay
+                while batch[-1] is not None and batch[-1][0] != "barrier" and rows < self.batch_size:
+                    try:
+                        op = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    batch.append(op)
+                    if op is not None and op[0] != "barrier":
+                        rows += len(op[1])
+                stop = self._apply(conn, batch)
+        finally:
+            conn.close()
+
+    def _apply(self, conn: sqlite3.Connection, batch: list) -> bool:
+        """Commit one batch; returns True when the close sentinel was reached."""
+        ops = [op for op in batch if op is not None and op[0] != "barrier"]
+        if ops and self._error is None:
+            try:
+                with conn:
+                    # Consecutive ops of the same kind become one executemany
+                    for kind, group in itertools.groupby(ops, key=lambda op: op[0]):
+                        self._WRITERS[kind](conn, [item for _kind, payload in group for item in payload])
+            except BaseException as e:  # keep draining so producers never block on a dead writer
+                logger.error("DB writer failed: %s", e)
+                self._error = e
+        for op in batch:
+            if op is not None and op[0] == "barrier":
+                op[1].set()
+        return batch[-1] is None
+
+    # -- context manager ------------------------------------------------------
+    def __enter__(self) -> DBWriter:
+        # SIGTERM would otherwise kill the process without unwinding; turn it into SystemExit so __exit__ runs
+        if threading.current_thread() is threading.main_thread():
+            self._prev_sigterm = signal.signal(signal.SIGTERM, _raise_system_exit)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        try:
+            self.close()
+        finally:
+            if self._prev_sigterm is not None:
+                signal.signal(signal.SIGTERM, self._prev_sigterm)
+                self._prev_sigterm = None
+
+
+def _raise_system_exit(signum, _frame) -> None:
+    raise SystemExit(128 + signum)
+
+
+_STATUS_FROM_TRACK_LANGUAGES = """
+    CASE
+        WHEN EXISTS (
+            SELECT 1 FROM track_languages tl
+            WHERE tl.track_id = tracks.track_id AND tl.confidence >= :auto_add
+        ) THEN 'add'
+        WHEN EXISTS (
+            SELECT 1 FROM track_languages tl
+            WHERE tl.track_id = tracks.track_id AND tl.confidence BETWEEN :review_min AND :review_max
+        ) THEN 'review'
+        ELSE 'skip'
+    END
+"""
+
+
+def reclassify(conn: sqlite3.Connection, only_pending: bool = False) -> int:
+    """
+    Recompute status, lid_lang and lid_confidence of every LID'd track from track_languages with the
+    current CONFIG thresholds, in one set-based UPDATE. Same decision as classify_language_confidences(),
+    including the tie-break (first language written wins). Only rows whose status changes are
+    rewritten; lid_lang/lid_confidence do not depend on thresholds. With `only_pending`, only tracks
+    reset to 'pending' (re-liked) are touched. Returns the number of rows updated.
+    """
+    with conn:
+        cur = conn.execute(
+            f"""
+            UPDATE tracks SET
+                status = {_STATUS_FROM_TRACK_LANGUAGES},
+                lid_lang = COALESCE((
+                    SELECT tl.lang_code FROM track_languages tl
+                    WHERE tl.track_id = tracks.track_id ORDER BY tl.confidence DESC, tl.rowid LIMIT 1
+                ), 'other'),
+                lid_confidence = COALESCE((
+                    SELECT MAX(tl.confidence) FROM track_languages tl WHERE tl.track_id = tracks.track_id
+                ), 0.0)
+            WHERE language_confidences IS NOT NULL AND status != 'unliked'
+                {"AND status = 'pending'" if only_pending else ""}
+                AND status IS NOT {_STATUS_FROM_TRACK_LANGUAGES}
+            """,
+            {
+                "auto_add": CONFIG["confidence_auto_add"],
+                "review_min": CONFIG["confidence_review_min"],
+                "review_max": CONFIG["confidence_review_max"],
+            },
+        )
+    return cur.rowcount
+
+
+# Tracks without lyrics that are due for a Genius attempt: never tried, or the last attempt is older than
+# base * 2^(attempts - 1), capped. The base is long for a definitive not-found, short after an error.
+_MISSING_LYRICS_WHERE = """
+    lyrics_state != 'present' AND status NOT IN ('skip', 'unliked')
+    AND (
+        last_attempt_at IS NULL
+        OR last_attempt_at <= strftime('%Y-%m-%dT%H:%M:%S', 'now', printf('-%d minutes', MIN(
+            :retry_max_minutes,
+            (1 << MIN(lyrics_attempts - 1, 30))
+                * CASE lyrics_outcome WHEN 'not_found' THEN :retry_not_found_minutes ELSE :retry_error_minutes END
+        )))
     )
-    return cur.fetchall()
+"""
+
+
+def _lyrics_retry_params() -> dict[str, int]:
+    return {
+        "retry_max_minutes": int(CONFIG["lyrics_retry_max_hours"] * 60),
+        "retry_not_found_minutes": int(CONFIG["lyrics_retry_not_found_hours"] * 60),
+        "retry_error_minutes": int(CONFIG["lyrics_retry_error_hours"] * 60),
+    }
+
+
+_MISSING_LID_WHERE = "lyrics_state = 'present' AND language_confidences IS NULL AND status != 'unliked'"
+
+
+def iter_tracks_missing_lyrics(
+    conn: sqlite3.Connection, page_size: int | None = None
+) -> Iterator[tuple[str, str, str, str]]:
+    """
+    Stream the lyrics work queue in track_id order, one page at a time (keyset pagination).
+    Safe while the caller updates yielded rows: each page restarts after the last track_id seen.
+    """
+    page_size = page_size or CONFIG["db_page_size"]
+    last_id = ""
+    while True:
+        rows = conn.execute(
+            f"""
+            SELECT track_id, name, artists, COALESCE(added_at, '') FROM tracks
+            WHERE {_MISSING_LYRICS_WHERE} AND track_id > :last_id
+            ORDER BY track_id LIMIT :page_size
+            """,
+            {**_lyrics_retry_params(), "last_id": last_id, "page_size": page_size},
+        ).fetchall()
+        if not rows:
+            return
+        yield from rows
+        last_id = rows[-1][0]
+
+
+def get_tracks_missing_lyrics(conn: sqlite3.Connection) -> list[tuple[str, str, str, str]]:
+    return list(iter_tracks_missing_lyrics(conn))
+
+
+def iter_tracks_missing_lid(conn: sqlite3.Connection, page_size: int | None = None) -> Iterator[tuple[str, bytes]]:
+    """
+    Stream (track_id, compressed lyrics) for tracks awaiting LID with bounded memory; decompress
+    with decompress_lyrics(). Keyset-paged like iter_tracks_missing_lyrics().
+    """
+    page_size = page_size or CONFIG["db_page_size"]
+    last_id = ""
+    while True:
+        rows = conn.execute(
+            f"""
+            SELECT t.track_id, l.body FROM tracks t JOIN lyrics l ON l.hash = t.lyrics_hash
+            WHERE {_MISSING_LID_WHERE} AND t.track_id > ?
+            ORDER BY t.track_id LIMIT ?
+            """,
+            (last_id, page_size),
+        ).fetchall()
+        if not rows:
+            return
+        yield from rows
+        last_id = rows[-1][0]
+
+
+def count_tracks_missing_lid(conn: sqlite3.Connection) -> int:
+    return conn.execute(f"SELECT COUNT(*) FROM tracks WHERE {_MISSING_LID_WHERE}").fetchone()[0]
+
+
+def get_tracks_missing_lid(conn: sqlite3.Connection) -> list[tuple[str, bytes]]:
+    """(track_id, compressed lyrics) for tracks awaiting LID; decompress with decompress_lyrics()."""
+    return list(iter_tracks_missing_lid(conn))
 
 
 def get_track_uris_for_language(conn: sqlite3.Connection, lang_codes: list[str]) -> list[str]:
     """Track IDs that have any of the given lang codes with confidence >= auto_add threshold."""
+    placeholders = ", ".join("?" for _ in lang_codes)
     cur = conn.cursor()
-    out = []
     cur.execute(
-        "SELECT track_id, language_confidences FROM tracks WHERE status IN ('add', 'review') AND language_confidences IS NOT NULL AND language_confidences != ''"
+        f"""
+        SELECT track_id FROM tracks
+        WHERE status IN ('add', 'review') AND track_id IN (
+            SELECT track_id FROM track_languages WHERE lang_code IN ({placeholders}) AND confidence >= ?
+        )
+        ORDER BY rowid
+        """,
+        (*lang_codes, CONFIG["confidence_auto_add"]),
     )
-    for track_id, j in cur.fetchall():
-        if not j:
-            continue
-        try:
-            confs = json.loads(j)
-        except json.JSONDecodeError:
-            continue
-        if any(confs.get(lc, 0) >= CONFIG["confidence_auto_add"] for lc in lang_codes):
-            out.append(track_id)
-    return out
+    return [row[0] for row in cur.fetchall()]
+
+
+def get_track_ids_by_language(
+    conn: sqlite3.Connection, language_playlists: dict[str, list[str]]
+) -> dict[str, list[str]]:
+    """
+    Playlist membership for every language in one query: {lang_name: [track_id, ...]}.
+    Same selection and order as calling get_track_uris_for_language() once per language.
+    """
+    codes = [(lang_name, lc) for lang_name, lang_codes in language_playlists.items() for lc in lang_codes]
+    if not codes:
+        return {}
+    values = ", ".join("(?, ?)" for _ in codes)
+    cur = conn.cursor()
+    cur.execute(
+        f"""
+        WITH codes(lang_name, lang_code) AS (VALUES {values})
+        SELECT c.lang_name, t.track_id
+        FROM codes c
+        JOIN track_languages tl ON tl.lang_code = c.lang_code AND tl.confidence >= ?
+        JOIN tracks t ON t.track_id = tl.track_id
+        WHERE t.status IN ('add', 'review')
+        ORDER BY t.rowid
+        """,
+        (*(v for pair in codes for v in pair), CONFIG["confidence_auto_add"]),
+    )
+    members: dict[str, dict[str, None]] = {lang_name: {} for lang_name in language_playlists}
+    for lang_name, track_id in cur.fetchall():
+        members[lang_name][track_id] = None
+    return {lang_name: list(ids) for lang_name, ids in members.items()}
 
 
 def get_all_tracks_with_languages(conn: sqlite3.Connection) -> list[tuple]:
@@ -221,26 +1013,486 @@ def get_tracks_for_review(conn: sqlite3.Connection) -> list[tuple]:
 # -----------------------------------------------------------------------------
 # Genius lyrics with exponential backoff
 # -----------------------------------------------------------------------------
-def fetch_lyrics_with_backoff(genius, title: str, artist: str) -> str | None:
-    delay = CONFIG["genius_delay"]
-    for attempt in range(CONFIG["genius_max_retries"]):
+# Error kinds worth retrying; anything else (4xx, parse errors) fails the attempt immediately
+_GENIUS_RETRYABLE = frozenset({"rate_limited", "server", "timeout", "connection"})
+
+
+def classify_genius_error(e: Exception) -> tuple[str, float | None]:
+    """
+    (kind, Retry-After seconds or None) for an exception raised by lyricsgenius. Kinds: rate_limited,
+    server, timeout, connection, unauthorized, client, unknown. lyricsgenius re-raises HTTP errors as
+    HTTPError(status, message) without the response, so the status may only be in args[0].
+    """
+    if isinstance(e, requests.Timeout):
+        return "timeout", None
+    if isinstance(e, requests.ConnectionError):
+        return "connection", None
+    if isinstance(e, requests.HTTPError):
+        response = getattr(e, "response", None)
+        status = getattr(response, "status_code", None)
+        if status is None and e.args and isinstance(e.args[0], int):
+            status = e.args[0]
+        retry_after = retry_after_seconds(response.headers.get("Retry-After")) if response is not None else None
+        if status == 429:
+            return "rate_limited", retry_after
+        if status is not None and status >= 500:
+            return "server", retry_after
+        if status == 401:
+            return "unauthorized", None
+        return "client", None
+    return "unknown", None
+
+
+def open_genius_cache() -> ResponseCache | None:
+    """On-disk Genius response cache (GENIUS_CACHE_PATH; empty disables it)."""
+    if not CONFIG["genius_cache_path"]:
+        return None
+    return ResponseCache(
+        CONFIG["genius_cache_path"],
+        ttl_seconds=CONFIG["genius_cache_ttl_days"] * 86400,
+        max_bytes=int(CONFIG["genius_cache_max_mb"] * 1024 * 1024),
+    )
+
+
+def _genius_request(
+    limiter: AdaptiveRateLimiter | None, cache: ResponseCache | None, key: str, fn, is_negative=lambda value: not value
+):
+    """
+    One Genius request through the response cache; only a cache miss costs a limiter token.
+    Negative answers (`is_negative(value)`) are cached no longer than LYRICS_RETRY_NOT_FOUND_HOURS,
+    so a not-found track that comes due again really asks Genius again.
+    """
+    if cache is not None:
+        value = cache.get(key)
+        if value is not MISS:
+            return value
+    if limiter is not None:
+        limiter.acquire()
+    else:
+        time.sleep(CONFIG["genius_delay"])
+    value = fn()
+    if limiter is not None:
+        limiter.on_success()
+    if cache is not None:
+        negative_ttl = CONFIG["lyrics_retry_not_found_hours"] * 3600 if is_negative(value) else None
+        cache.put(key, value, ttl_seconds=negative_ttl)
+    return value
+
+
+# Titles lyricsgenius rejects as non-songs (its default excluded_terms)
+_GENIUS_NON_SONG = re.compile(
+    r"track\s?list|album art(work)?|liner notes|booklet|credits|interview|skit|instrumental|setlist", re.IGNORECASE
+)
+
+
+def _song_hits(response: dict) -> list[dict]:
+    """Slim song hits from an API search response: only the fields used to pick one are cached."""
+    return [
+        {
+            "title": h["result"].get("title") or "",
+            "artist": (h["result"].get("primary_artist") or {}).get("name") or "",
+            "url": h["result"].get("url"),
+            "lyrics_state": h["result"].get("lyrics_state"),
+            "instrumental": bool(h["result"].get("instrumental")),
+        }
+        for h in response.get("hits", [])
+        if h.get("type") == "song" and h.get("result")
+    ]
+
+
+def _has_lyrics(hit: dict) -> bool:
+    return (
+        hit["lyrics_state"] == "complete"
+        and not hit["instrumental"]
+        and bool(hit["url"])
+        and not _GENIUS_NON_SONG.search(hit["title"])
+    )
+
+
+def _pick_song_hit(hits: list[dict], variant: QueryVariant, artists: str) -> dict | None:
+    """
+    Best hit with lyrics for one query variant: a title match by one of the track's artists, then a
+    title match, then (like lyricsgenius search_song()) the first hit, unless its artist is clearly
+    not one of the track's. Artist names are compared transliteration-insensitively; title-only
+    variants only accept title matches not contradicted by the artist.
+    """
+    candidates = [h for h in hits if _has_lyrics(h)]
+    by_artist = [h for h in candidates if artist_matches(h["artist"], artists) is not False]
+    title_hits = [h for h in candidates if titles_match(h["title"], variant.title)]
+    for hit in title_hits:
+        if artist_matches(hit["artist"], artists):
+            return hit
+    if variant.require_artist:
+        return next((h for h in title_hits if h in by_artist), None)
+    if title_hits:
+        return title_hits[0]
+    return next(iter(by_artist), None)
+
+
+def genius_lookup(
+    genius,
+    title: str,
+    artists: str,
+    limiter: AdaptiveRateLimiter | None = None,
+    cache: ResponseCache | None = None,
+    stats: VariantStats | None = None,
+) -> str | None:
+    """
+    Try query variants of (title, artists) best-first (lyrics_normalize.query_variants(), ranked by
+    `stats`), at most LYRICS_QUERY_VARIANTS of them, until one yields lyrics. Each variant is
+    search_song() split into two cacheable requests: the API search, keyed by normalized (title, artist),
+    and the lyrics page, keyed by its URL. Returns the lyrics, or None when no variant finds any.
+    Variant hits/misses go to `stats` only when the walk completes, so a lookup that raises and is
+    retried by fetch_lyrics_with_backoff() does not count its earlier variants twice.
+    """
+    variants = query_variants(title, artists)
+    if stats is not None:
+        variants = stats.rank(variants)
+    tried: list[tuple[str, bool]] = []
+    found = None
+    for variant in variants[: max(1, CONFIG["lyrics_query_variants"])]:
+        query = f"{variant.title} {variant.artist}".strip()
+        hits = _genius_request(
+            limiter,
+            cache,
+            "search:" + normalize_key(variant.title, variant.artist),
+            lambda: _song_hits(genius.search_songs(query)),
+            # Hits we would not pick count as a miss too: the right song may be added later
+            is_negative=lambda hits: _pick_song_hit(hits, variant, artists) is None,
+        )
+        hit = _pick_song_hit(hits, variant, artists)
+        lyrics = None
+        if hit is not None:
+            lyrics = _genius_request(
+                limiter,
+                cache,
+                "lyrics:" + hit["url"],
+                lambda: genius.lyrics(song_url=hit["url"], remove_section_headers=True),
+                is_negative=lambda lyrics: not (lyrics and lyrics.strip()),
+            )
+        tried.append((variant.name, bool(lyrics and lyrics.strip())))
+        if tried[-1][1]:
+            found = lyrics
+            break
+    if stats is not None:
+        for name, hit in tried:
+            stats.record(name, hit)
+    return found
+
+
+def fetch_lyrics_with_backoff(
+    genius,
+    title: str,
+    artists: str,
+    limiter: AdaptiveRateLimiter | None = None,
+    cache: ResponseCache | None = None,
+    stats: VariantStats | None = None,
+) -> tuple[str | None, str]:
+    """
+    Look up one song (`artists` comma-separated, as stored); returns (lyrics, outcome) with outcome
+    'found', 'not_found' (Genius answered but has no lyrics) or 'error' (gave up, or a non-retryable
+    error). Requests answered by `cache` are free; the others take a token from `limiter` (or sleep
+    genius_delay when None) and report success/throttling back to it. A 429 holds every worker for
+    Retry-After; other transient errors back off this caller only.
+    """
+    max_retries = CONFIG["genius_max_retries"]
+    for attempt in range(max_retries):
         try:
-            time.sleep(delay)
-            song = genius.search_song(title, artist)
-            if song and getattr(song, "lyrics", None):
-                return song.lyrics.strip()
-            return None
+            lyrics = genius_lookup(genius, title, artists, limiter, cache, stats)
         except Exception as e:
-            if "429" in str(e) or "rate" in str(e).lower():
-                delay = min(60, delay * 2)
-                logger.warning("Genius rate limit; backing off to %.1fs", delay)
+            kind, retry_after = classify_genius_error(e)
+            if kind == "unauthorized":
+                raise RuntimeError("Genius rejected GENIUS_ACCESS_TOKEN (HTTP 401)") from e
+            if limiter is not None:
+                limiter.on_error(kind)
+            if kind not in _GENIUS_RETRYABLE or attempt == max_retries - 1:
+                logger.warning("Gave up lyrics for %s - %s after %d attempt(s) (%s: %s)", title, artists, attempt + 1, kind, e)
+                return None, "error"
+            delay = retry_after if retry_after is not None else backoff_delay(attempt, base=CONFIG["genius_delay"])
+            if kind == "rate_limited":
+                logger.warning("Genius rate limit; holding all lookups for %.1fs", delay)
+                if limiter is not None:
+                    limiter.on_throttle(delay)
+                    continue
             else:
-                logger.debug("Genius error for %s - %s: %s", title, artist, e)
-            if attempt == CONFIG["genius_max_retries"] - 1:
-                logger.warning("Gave up lyrics for %s - %s after %d attempts", title, artist, CONFIG["genius_max_retries"])
-                return None
+                logger.debug("Genius %s error for %s - %s: %s; retrying in %.1fs", kind, title, artists, e, delay)
             time.sleep(delay)
-    return None
+            continue
+        lyrics = (lyrics or "").strip()
+        return (lyrics, "found") if lyrics else (None, "not_found")
+    return None, "error"
+
+
+def genius_rate_limiter() -> AdaptiveRateLimiter:
+    return AdaptiveRateLimiter(CONFIG["genius_rate"], max_rate=CONFIG["genius_rate_max"])
+
+
+def _genius_client_factory(token: str):
+    """Return a getter for a per-thread lyricsgenius client (each one owns its requests.Session)."""
+    import lyricsgenius
+
+    local = threading.local()
+
+    def get():
+        genius = getattr(local, "genius", None)
+        if genius is None:
+            # Pacing and retries are ours (shared limiter, typed errors); lyricsgenius clamps sleep_time to its
+            # 0.2s minimum, and retries=0 makes 429/5xx/timeouts surface instead of being retried blindly
+            genius = lyricsgenius.Genius(token, sleep_time=0, retries=0)
+            local.genius = genius
+        return genius
+
+    return get
+
+
+def group_lyrics_queue(tracks: Iterable[tuple[str, str, str, str]]) -> list[list[tuple[str, str, str, str]]]:
+    """
+    Group (track_id, name, artists, added_at) rows by lyrics_key() of (title, primary artist), in order
+    of first appearance. Remasters, film-credited, single/album and regional releases of one song share
+    a group and need a single Genius lookup.
+    """
+    groups: dict[str, list[tuple[str, str, str, str]]] = {}
+    for row in tracks:
+        groups.setdefault(lyrics_key(row[1], primary_artist(row[2])), []).append(row)
+    return list(groups.values())
+
+
+class GeniusProvider:
+    """
+    LyricsProvider backed by the Genius API: ranked query variants, typed retries, a shared AIMD rate
+    limiter, the on-disk response cache and per-thread lyricsgenius clients.
+    """
+
+    name = "genius"
+    authoritative = True
+
+    def __init__(
+        self,
+        token: str,
+        limiter: AdaptiveRateLimiter | None = None,
+        cache: ResponseCache | None = None,
+        variant_stats: VariantStats | None = None,
+    ):
+        self._client = _genius_client_factory(token)
+        self.limiter = limiter or genius_rate_limiter()
+        self.cache = cache
+        self.variant_stats = variant_stats
+
+    def fetch(self, title: str, artists: str) -> LyricsResult:
+        lyrics, outcome = fetch_lyrics_with_backoff(
+            self._client(), title, artists, limiter=self.limiter, cache=self.cache, stats=self.variant_stats
+        )
+        return LyricsResult(lyrics, outcome, self.name)
+
+    def progress(self) -> dict[str, object]:
+        return {"rate": self.limiter.snapshot()["rate_per_s"], "throttles": self.limiter.throttles}
+
+    def checkpoint(self, writer: DBWriter) -> None:
+        if self.variant_stats is not None:
+            writer.add_variant_stats(self.variant_stats.pending())
+
+    def stats(self) -> dict[str, object]:
+        stats: dict[str, object] = {"limiter": self.limiter.snapshot()}
+        if self.variant_stats is not None:
+            stats["variant hits/attempts"] = self.variant_stats.snapshot()
+        return stats
+
+
+def build_lyrics_chain(conn: sqlite3.Connection, cache: ResponseCache | None) -> FallbackChain:
+    """
+    FallbackChain of the providers named in LYRICS_PROVIDERS, in order. Providers that can't run here
+    (no response cache, no LYRICS_CORPUS, no GENIUS_ACCESS_TOKEN) are left out.
+    """
+    providers: list[LyricsProvider] = []
+    for name in (n.strip() for n in CONFIG["lyrics_providers"].split(",")):
+        if not name:
+            continue
+        if name == "cache":
+            if cache is not None:
+                providers.append(CacheProvider(cache))
+        elif name == "corpus":
+            if CONFIG["lyrics_corpus"]:
+                corpus = LocalCorpusProvider(CONFIG["lyrics_corpus"])
+                logger.info("Loaded %d lyrics from local corpus %s", len(corpus), CONFIG["lyrics_corpus"])
+                providers.append(corpus)
+        elif name == "genius":
+            token = os.environ.get("GENIUS_ACCESS_TOKEN")
+            if token:
+                providers.append(GeniusProvider(token, cache=cache, variant_stats=VariantStats(get_variant_stats(conn))))
+            else:
+                logger.warning("GENIUS_ACCESS_TOKEN not set; Genius lyrics lookups disabled. Set it for full pipeline.")
+        elif name == "stub":
+            providers.append(
+                StubProvider(
+                    latency_s=CONFIG["lyrics_stub_latency_ms"] / 1000,
+                    error_rate=CONFIG["lyrics_stub_error_rate"],
+                    miss_rate=CONFIG["lyrics_stub_miss_rate"],
+                )
+            )
+        else:
+            raise ValueError(f"Unknown lyrics provider {name!r} in LYRICS_PROVIDERS")
+    return FallbackChain(providers)
+
+
+def iter_fetched_lyrics(
+    groups: Iterable[list[tuple[str, str, str, str]]],
+    provider: LyricsProvider,
+    workers: int | None = None,
+) -> Iterator[tuple[list[tuple[str, str, str, str]], LyricsResult]]:
+    """
+    Fetch lyrics once per group of (track_id, name, artists, added_at) rows (see group_lyrics_queue()),
+    querying `provider` with the group's first row on `workers` threads. Yields (group, LyricsResult)
+    as lookups complete. At most 2x workers lookups are in flight, so a consumer blocked on a full
+    DBWriter queue stalls the fetchers too. `groups` is only iterated on the calling thread.
+    """
+    workers = workers or CONFIG["genius_workers"]
+
+    def fetch(group):
+        _track_id, name, artists, _added_at = group[0]
+        return group, provider.fetch(name, artists)
+
+    groups = iter(groups)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lyrics") as pool:
+        pending = {pool.submit(fetch, group) for group in itertools.islice(groups, workers * 2)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+            pending |= {pool.submit(fetch, group) for group in itertools.islice(groups, len(done))}
+
+
+def fetch_missing_lyrics(
+    conn: sqlite3.Connection, writer: DBWriter, chain: FallbackChain, workers: int | None = None
+) -> dict[str, int]:
+    """
+    Stage 2: fill in lyrics for every track due in the lyrics queue from `chain`, one lookup per
+    group_lyrics_queue() group, fanned out to the group in one write. Returns track counts per
+    outcome ('found by <provider>', 'not_found', 'error', 'skipped').
+    """
+    groups = group_lyrics_queue(iter_tracks_missing_lyrics(conn))
+    n_missing = sum(len(g) for g in groups)
+    logger.info(
+        "Fetching lyrics for %d tracks as %d lookups from %s (%d workers)...",
+        n_missing,
+        len(groups),
+        " -> ".join(p.name for p in chain.providers),
+        workers or CONFIG["genius_workers"],
+    )
+    checkpoints = [p.checkpoint for p in chain.providers if hasattr(p, "checkpoint")]
+    progress = [p.progress for p in chain.providers if hasattr(p, "progress")]
+    outcomes: dict[str, int] = {}
+    bar = tqdm(desc="Lyrics", total=n_missing)
+    for n_done, (group, result) in enumerate(iter_fetched_lyrics(groups, chain, workers), 1):
+        label = f"found by {result.provider}" if result.outcome == "found" else result.outcome
+        outcomes[label] = outcomes.get(label, 0) + len(group)
+        bar.update(len(group))
+        if progress and n_done % 20 == 0:
+            bar.set_postfix({k: v for fn in progress for k, v in fn().items()}, refresh=False)
+        if n_done % 100 == 0:
+            for checkpoint in checkpoints:
+                checkpoint(writer)
+        # No provider could judge (e.g. only local sources configured): not an attempt, leave the track queued
+        if result.outcome == "skipped":
+            continue
+        # A definitive not-found is stored as empty lyrics; an error leaves the lyrics state alone
+        lyrics = "" if result.outcome == "not_found" else result.lyrics
+        # One write fans the result out to every track in the group
+        writer.upsert_tracks(
+            [
+                {
+                    "track_id": track_id,
+                    "name": name,
+                    "artists": artists,
+                    "added_at": added_at,
+                    "lyrics": lyrics,
+                    "lyrics_outcome": result.outcome,
+                }
+                for track_id, name, artists, added_at in group
+            ]
+        )
+    for checkpoint in checkpoints:
+        checkpoint(writer)
+    bar.close()
+    writer.flush()
+    logger.info("Lyrics outcomes: %s; %d lookups saved by grouping", outcomes, n_missing - len(groups))
+    for p in chain.providers:
+        if hasattr(p, "stats"):
+            logger.info("Lyrics provider %s: %s", p.name, p.stats())
+    return outcomes
+
+
+def _write_imported_lyrics(conn: sqlite3.Connection, rows: list[tuple[str, str]]) -> None:
+    """Store (track_id, lyrics) rows as found lyrics in one transaction; tracks that already have lyrics keep them."""
+    with conn:
+        _store_lyrics(conn, {_lyrics_hash(lyrics): lyrics for _track_id, lyrics in rows})
+        conn.executemany(
+            """
+            UPDATE tracks SET lyrics_hash = ?, lyrics_state = 'present', lyrics_outcome = 'found'
+            WHERE track_id = ? AND lyrics_state != 'present'
+            """,
+            [(_lyrics_hash(lyrics), track_id) for track_id, lyrics in rows],
+        )
+
+
+def import_lyrics(conn: sqlite3.Connection, path: str, batch_size: int = 5000) -> dict[str, int]:
+    """
+    Bulk-load lyrics from a local corpus (see lyrics_providers.iter_corpus()) into tracks that have
+    none yet. Each entry is matched by Spotify track ID, then ISRC, then lyrics_key(title, primary
+    artist), then cleaned title with an artist check; it fills every matching track (duplicate
+    releases share lyrics). The first matching entry wins. Imported tracks are 'present', so stage 2
+    skips them and LID picks them up. Writes go in transactions of `batch_size` tracks. Returns
+    counts of entries per match kind plus 'unmatched', and 'tracks' imported.
+    """
+    by_id: dict[str, tuple[str, str]] = {}
+    by_isrc: dict[str, list[str]] = {}
+    by_key: dict[str, list[str]] = {}
+    by_title: dict[str, list[str]] = {}
+    for track_id, name, artists, isrc in conn.execute(
+        "SELECT track_id, name, artists, isrc FROM tracks WHERE lyrics_state != 'present'"
+    ):
+        by_id[track_id] = (name or "", artists or "")
+        if isrc:
+            by_isrc.setdefault(isrc, []).append(track_id)
+        by_key.setdefault(lyrics_key(name, primary_artist(artists)), []).append(track_id)
+        by_title.setdefault(normalize_text(clean_title(name or "")), []).append(track_id)
+    logger.info("Importing lyrics from %s for %d tracks without lyrics...", path, len(by_id))
+
+    counts = {"track_id": 0, "isrc": 0, "title_artist": 0, "unmatched": 0, "tracks": 0}
+    batch: list[tuple[str, str]] = []
+    bar = tqdm(desc="Import lyrics", unit=" entries")
+    for entry in iter_corpus(path):
+        bar.update(1)
+        if entry.track_id in by_id:
+            kind, matches = "track_id", [entry.track_id]
+        elif entry.isrc in by_isrc:
+            kind, matches = "isrc", by_isrc[entry.isrc]
+        elif entry.title:
+            kind = "title_artist"
+            matches = by_key.get(lyrics_key(entry.title, primary_artist(entry.artist)), [])
+            if not matches and entry.artist:
+                matches = [
+                    track_id
+                    for track_id in by_title.get(normalize_text(clean_title(entry.title)), ())
+                    if track_id in by_id
+                    and any(artist_matches(a, by_id[track_id][1]) for a in split_artists(entry.artist))
+                ]
+        else:
+            matches = []
+        # Tracks filled by an earlier entry are dropped from by_id; stale list entries are skipped here
+        matches = [track_id for track_id in matches if by_id.pop(track_id, None) is not None]
+        if not matches:
+            counts["unmatched"] += 1
+            continue
+        counts[kind] += 1
+        counts["tracks"] += len(matches)
+        batch.extend((track_id, entry.lyrics) for track_id in matches)
+        if len(batch) >= batch_size:
+            _write_imported_lyrics(conn, batch)
+            batch = []
+    if batch:
+        _write_imported_lyrics(conn, batch)
+    bar.close()
+    return counts
 
 
 # -----------------------------------------------------------------------------
@@ -261,126 +1513,343 @@ def get_spotify_client():
         scope=SCOPE,
         cache_path=cache_path,
     )
-    return spotipy.Spotify(auth_manager=auth_manager)
+    # A plain session (no urllib3 retry adapter) so 429/5xx reach PacedSpotify with their Retry-After header
+    # instead of being slept on inside spotipy
+    return PacedSpotify(spotipy.Spotify(auth_manager=auth_manager, requests_session=requests.Session()))
 
 
-def fetch_all_liked_tracks(sp) -> list[dict]:
-    tracks = []
-    offset = 0
+def _saved_item_to_track(item: dict) -> dict | None:
+    t = item.get("track") or {}
+    track_id = t.get("id")
+    if not track_id:
+        return None
+    return {
+        "track_id": track_id,
+        "name": t.get("name") or "",
+        "artists": ", ".join(a.get("name", "") for a in (t.get("artists") or [])),
+        "added_at": (item.get("added_at") or "")[:19],
+        "isrc": ((t.get("external_ids") or {}).get("isrc") or "").strip().upper() or None,
+    }
+
+
+class PacedSpotify:
+    """
+    Proxy around spotipy.Spotify that routes every API method through one shared AIMDPacer.
+    - 429: every caller holds off for Retry-After, the pacer slows down, and the call is retried
+      (a throttled request was never applied, so this is safe for writes too).
+    - 5xx / connection errors / timeouts: retried with jittered backoff, only for idempotent methods.
+    No sleep happens until Spotify actually throttles; counters are in stats().
+    """
+
+    # Repeating these after an ambiguous failure could apply them twice
+    NON_IDEMPOTENT = frozenset({"playlist_add_items", "user_playlist_create", "playlist_reorder_items"})
+    RETRY_STATUSES = frozenset({500, 502, 503, 504})
+
+    def __init__(self, sp, pacer: AIMDPacer | None = None, max_retries: int | None = None):
+        self._sp = sp
+        self.pacer = pacer or AIMDPacer()
+        self.max_retries = CONFIG["spotify_max_retries"] if max_retries is None else max_retries
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        attr = getattr(self._sp, name)
+        if not callable(attr):
+            return attr
+        idempotent = name not in self.NON_IDEMPOTENT
+        return lambda *args, **kwargs: self.call(attr, *args, idempotent=idempotent, **kwargs)
+
+    def call(self, fn, *args, idempotent: bool = True, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            self.pacer.wait()
+            try:
+                result = fn(*args, **kwargs)
+            except SpotifyException as e:
+                if attempt == self.max_retries:
+                    raise
+                if e.http_status == 429:
+                    headers = getattr(e, "headers", None) or {}
+                    delay = retry_after_seconds(headers.get("Retry-After"), default=backoff_delay(attempt))
+                    logger.warning("Spotify rate limit; pausing all requests for %.1fs", delay)
+                    self.pacer.on_throttle(delay)
+                elif idempotent and e.http_status in self.RETRY_STATUSES:
+                    self._backoff(attempt, e)
+                else:
+                    raise
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if not idempotent or attempt == self.max_retries:
+                    raise
+                self._backoff(attempt, e)
+            else:
+                self.pacer.on_success()
+                return result
+            with self._lock:
+                self.retries += 1
+
+    def _backoff(self, attempt: int, error: Exception) -> None:
+        delay = backoff_delay(attempt)
+        logger.warning("Spotify request failed (%s); retrying in %.1fs", error, delay)
+        time.sleep(delay)
+
+    def stats(self) -> dict[str, float]:
+        return {**self.pacer.snapshot(), "retries": self.retries}
+
+
+def _saved_page_to_tracks(items: list[dict], seen: set[str]) -> list[dict]:
+    """Parse one page of saved items, dropping tracks already yielded (a like can shift pages mid-sync)."""
+    page = []
+    for item in items:
+        track = _saved_item_to_track(item)
+        if track is None or track["track_id"] in seen:
+            continue
+        seen.add(track["track_id"])
+        page.append(track)
+    return page
+
+
+def iter_liked_track_pages(
+    sp, since: str | None = None, offset: int = 0, seen: set[str] | None = None
+) -> Iterator[list[dict]]:
+    """
+    Yield Liked Songs one API page at a time (newest first, as Spotify returns them).
+    With `since` (an added_at watermark), stop at the first track added at or before it.
+    `offset` and `seen` let iter_liked_track_pages_parallel() continue a listing sequentially.
+    """
     limit = 50
+    seen = set() if seen is None else seen
     while True:
         resp = sp.current_user_saved_tracks(limit=limit, offset=offset)
         items = resp.get("items", [])
         if not items:
             break
-        for item in items:
-            t = item.get("track") or {}
-            track_id = t.get("id")
-            if not track_id:
-                continue
-            name = t.get("name") or ""
-            artists = ", ".join(a.get("name", "") for a in (t.get("artists") or []))
-            added_at = (item.get("added_at") or "")[:19]
-            tracks.append(
-                {
-                    "track_id": track_id,
-                    "name": name,
-                    "artists": artists,
-                    "added_at": added_at,
-                }
-            )
+        page = _saved_page_to_tracks(items, seen)
+        if since:
+            fresh = [t for t in page if not (t["added_at"] and t["added_at"] <= since)]
+            if len(fresh) < len(page):
+                if fresh:
+                    yield fresh
+                return
+        if page:
+            yield page
         offset += limit
         if not resp.get("next"):
             break
-    return tracks
 
 
-def find_or_create_playlist(sp, name: str, description: str = "South Asian tracks from Liked Songs"):
+def iter_liked_track_pages_parallel(sp, workers: int | None = None) -> Iterator[list[dict]]:
+    """
+    Full sync with concurrent page fetches. The first page gives `total`; the remaining offsets are
+    fetched by a bounded pool; throttling is shared through the client's pacer. Pages are yielded
+    in offset order as soon as they are ready, with the same de-duplication as
+    iter_liked_track_pages().
+    """
+    limit = 50
+    workers = workers or CONFIG["spotify_workers"]
+    seen: set[str] = set()
+    first = sp.current_user_saved_tracks(limit=limit, offset=0)
+    page = _saved_page_to_tracks(first.get("items", []), seen)
+    if page:
+        yield page
+    if not first.get("next"):
+        return
+    offsets = iter(range(limit, int(first.get("total") or 0), limit))
+    last_offset, resp = 0, first
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="spotify-sync") as pool:
+        # Keep at most 2x workers pages in flight so a slow consumer bounds memory
+        pending = deque(
+            (offset, pool.submit(sp.current_user_saved_tracks, limit=limit, offset=offset))
+            for offset in itertools.islice(offsets, workers * 2)
+        )
+        while pending:
+            last_offset, future = pending.popleft()
+            resp = future.result()
+            for offset in itertools.islice(offsets, 1):
+                pending.append((offset, pool.submit(sp.current_user_saved_tracks, limit=limit, offset=offset)))
+            page = _saved_page_to_tracks(resp.get("items", []), seen)
+            if page:
+                yield page
+    # Likes added during the sync push the oldest tracks past the first page's `total`; page on from there
+    if resp.get("next"):
+        yield from iter_liked_track_pages(sp, offset=last_offset + limit, seen=seen)
+
+
+def _liked_total(sp) -> int:
+    """Live number of Liked Songs, as reported by the API."""
+    return int(sp.current_user_saved_tracks(limit=1).get("total") or 0)
+
+
+def fetch_all_liked_tracks(sp) -> list[dict]:
+    return [track for page in iter_liked_track_pages(sp) for track in page]
+
+
+def _full_sync_due(conn: sqlite3.Connection) -> bool:
+    """A full (non-incremental) sync runs when there is no watermark or the last one is older than full_sync_days."""
+    if not get_sync_state(conn, "liked_watermark"):
+        return True
+    last_full = get_sync_state(conn, "last_full_sync_at")
+    if not last_full:
+        return True
+    days = CONFIG["full_sync_days"]
+    if days <= 0:
+        return False
+    age = datetime.now(timezone.utc) - datetime.fromisoformat(last_full).replace(tzinfo=timezone.utc)
+    return age.total_seconds() >= days * 86400
+
+
+def find_or_create_playlists(sp, descriptions: dict[str, str]) -> dict[str, str]:
+    """
+    Resolve many playlist titles in one walk over the user's playlists; create only the missing
+    ones. `descriptions` maps title -> description used on creation. Returns title -> playlist_id.
+    """
+    found: dict[str, str] = {}
+    if not descriptions:
+        return found
     user_id = sp.current_user()["id"]
     playlists = sp.user_playlists(user_id, limit=50)
     while playlists:
         for p in playlists.get("items", []):
-            if p.get("name") == name:
-                return p["id"]
-        if not playlists.get("next"):
+            name = p.get("name")
+            if name in descriptions and name not in found:
+                found[name] = p["id"]
+        if len(found) == len(descriptions) or not playlists.get("next"):
             break
         playlists = sp.next(playlists)
-    pl = sp.user_playlist_create(user_id, name, public=False, description=description)
-    return pl["id"]
+    for name, description in descriptions.items():
+        if name not in found:
+            found[name] = sp.user_playlist_create(user_id, name, public=False, description=description)["id"]
+    return found
+
+
+def find_or_create_playlist(sp, name: str, description: str = "South Asian tracks from Liked Songs"):
+    return find_or_create_playlists(sp, {name: description})[name]
 
 
-def add_tracks_to_playlist(sp, playlist_id: str, track_uris: list[str]) -> None:
+def add_tracks_to_playlist(sp, playlist_id: str, track_uris: list[str]) -> str | None:
+    """Append tracks in batches; returns the snapshot_id of the last write (None if nothing was sent)."""
     batch_size = CONFIG["spotify_batch_size"]
+    snapshot_id = None
     for i in range(0, len(track_uris), batch_size):
         batch = track_uris[i : i + batch_size]
-        sp.playlist_add_items(playlist_id, batch)
-        if i + batch_size < len(track_uris):
-            time.sleep(0.5)
+        snapshot_id = sp.playlist_add_items(playlist_id, batch).get("snapshot_id")
+    return snapshot_id
+
+
+def get_playlist_track_uris(sp, playlist_id: str) -> list[str]:
+    """Current track URIs of a playlist, in playlist order (paged, 100 per call)."""
+    uris = []
+    resp = sp.playlist_items(playlist_id, fields="items(track(uri)),next", limit=100, additional_types=("track",))
+    while resp:
+        for item in resp.get("items", []):
+            uri = (item.get("track") or {}).get("uri")
+            if uri:
+                uris.append(uri)
+        resp = sp.next(resp) if resp.get("next") else None
+    return uris
 
 
-def replace_playlist_tracks(sp, playlist_id: str, track_uris: list[str]) -> None:
+def replace_playlist_tracks(sp, playlist_id: str, track_uris: list[str]) -> tuple[int, int, str | None]:
+    """
+    Make the playlist hold exactly `track_uris` by sending only the delta: removed tracks via
+    playlist_remove_all_occurrences_of_items, new ones appended. The playlist is never emptied
+    mid-run, and an unchanged playlist costs only the read calls.
+    Returns (added, removed, snapshot_id of the last write or None).
+    """
     batch_size = CONFIG["spotify_batch_size"]
-    sp.playlist_replace_items(playlist_id, [])
-    for i in range(0, len(track_uris), batch_size):
-        batch = track_uris[i : i + batch_size]
-        sp.playlist_add_items(playlist_id, batch)
-        if i + batch_size < len(track_uris):
-            time.sleep(0.5)
+    current = get_playlist_track_uris(sp, playlist_id)
+    current_set, wanted = set(current), set(track_uris)
+    # Only spotify:track URIs can be removed by URI; leave local files and episodes alone
+    to_remove = [u for u in dict.fromkeys(current) if u not in wanted and u.startswith("spotify:track:")]
+    to_add = [u for u in dict.fromkeys(track_uris) if u not in current_set]
+    snapshot_id = None
+    for i in range(0, len(to_remove), batch_size):
+        snapshot_id = sp.playlist_remove_all_occurrences_of_items(playlist_id, to_remove[i : i + batch_size]).get(
+            "snapshot_id"
+        )
+    snapshot_id = add_tracks_to_playlist(sp, playlist_id, to_add) or snapshot_id
+    return len(to_add), len(to_remove), snapshot_id
 
 
 # -----------------------------------------------------------------------------
 # Main pipeline
 # -----------------------------------------------------------------------------
-def run():
+def run(full_sync: bool = False):
     conn = get_conn()
     init_db(conn)
+    logger.info("SQLite profile '%s': %s", CONFIG["db_profile"], get_db_settings(conn))
 
-    # ----- 1) Spotify: fetch all liked tracks and persist -----
-    logger.info("Connecting to Spotify...")
-    sp = get_spotify_client()
-    liked = fetch_all_liked_tracks(sp)
-    logger.info("Fetched %d liked tracks. Syncing to DB...", len(liked))
-    for t in liked:
-        upsert_track(
-            conn,
-            track_id=t["track_id"],
-            name=t["name"],
-            artists=t["artists"],
-            added_at=t["added_at"],
-        )
-    conn.commit()
+    # Stages 1-3 only enqueue writes; the writer thread commits them in batches
+    with DBWriter() as writer:
+        # ----- 1) Spotify: sync liked tracks (incremental from the added_at watermark) -----
+        logger.info("Connecting to Spotify...")
+        sp = get_spotify_client()
+        watermark = get_sync_state(conn, "liked_watermark")
+        full_sync = full_sync or _full_sync_due(conn)
+        logger.info("Syncing liked tracks (%s)...", "full" if full_sync else f"added after {watermark}")
+        sync_started = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+        n_liked = 0
+        liked_ids: set[str] = set()
+        newest = watermark or ""
+        if full_sync:
+            total_before = _liked_total(sp)
+            pages = iter_liked_track_pages_parallel(sp)
+        else:
+            pages = iter_liked_track_pages(sp, since=watermark)
+        for page in pages:
+            writer.upsert_tracks(page)
+            n_liked += len(page)
+            if full_sync:
+                liked_ids.update(t["track_id"] for t in page)
+            newest = max([newest] + [t["added_at"] for t in page])
+        if newest:
+            writer.set_sync_state("liked_watermark", newest)
+        if full_sync:
+            total_after = _liked_total(sp)
+            if not liked_ids:
+                logger.warning("Spotify returned no liked tracks; not marking stored tracks as unliked.")
+                writer.set_sync_state("last_full_sync_at", sync_started)
+            elif total_before == total_after == len(liked_ids):
+                writer.mark_unliked(liked_ids)
+                writer.set_sync_state("last_full_sync_at", sync_started)
+            else:
+                # Offset paging over a library that changed mid-sync can skip tracks that are still liked;
+                # leave last_full_sync_at alone so the next run retries the full sync
+                logger.warning(
+                    "Liked Songs changed during the full sync (%d -> %d tracks, %d listed); not marking stored tracks as unliked.",
+                    total_before,
+                    total_after,
+                    len(liked_ids),
+                )
+        writer.flush()
+        logger.info("Synced %d liked tracks to DB.", n_liked)
+        # Re-liked tracks come back as 'pending'; restore their status from stored confidences
+        if conn.execute("SELECT 1 FROM tracks WHERE status = 'pending' AND language_confidences IS NOT NULL LIMIT 1").fetchone():
+            reclassify(conn, only_pending=True)
 
-    # ----- 2) Genius: fetch lyrics for tracks missing them -----
-    genius_token = os.environ.get("GENIUS_ACCESS_TOKEN")
-    if genius_token:
-        import lyricsgenius
-        genius = lyricsgenius.Genius(genius_token, sleep_time=CONFIG["genius_delay"], retries=2)
-        genius.remove_section_headers = True
-        missing = get_tracks_missing_lyrics(conn)
-        logger.info("Fetching lyrics for %d tracks...", len(missing))
-        for track_id, name, artists, added_at in tqdm(missing, desc="Lyrics"):
-            lyrics = fetch_lyrics_with_backoff(genius, name, artists.split(",")[0].strip() if artists else "")
-            upsert_track(conn, track_id=track_id, name=name, artists=artists, added_at=added_at, lyrics=lyrics or "")
-        conn.commit()
-    else:
-        logger.warning("GENIUS_ACCESS_TOKEN not set; skipping lyrics fetch. Set it for full pipeline.")
+        # ----- 2) Lyrics: fetch for tracks missing them (cache -> local corpus -> Genius by default) -----
+        cache = open_genius_cache()
+        chain = build_lyrics_chain(conn, cache)
+        if chain.providers:
+            fetch_missing_lyrics(conn, writer, chain)
+        else:
+            logger.warning("No lyrics provider available (see LYRICS_PROVIDERS); skipping lyrics fetch.")
+        if cache is not None:
+            logger.info("Response cache (%s): %s", cache.path, cache.stats())
+            cache.close()
 
-    # ----- 3) IndicLID: run LID and set status -----
-    try:
-        from indiclid_wrapper import IndicLIDWrapper
-    except Exception as e:
-        logger.error("IndicLID not available: %s. See requirements.txt.", e)
-        return
-    lid = IndicLIDWrapper(model_dir=CONFIG["model_dir"])
-    to_lid = get_tracks_missing_lid(conn)
-    logger.info("Running IndicLID on %d tracks...", len(to_lid))
-    for track_id, lyrics in tqdm(to_lid, desc="LID"):
-        if not lyrics or not lyrics.strip():
-            update_language_result(conn, track_id, {})
-            continue
-        confidences = lid.get_south_asian_language_confidences(lyrics)
-        update_language_result(conn, track_id, confidences)
-    conn.commit()
+        # ----- 3) IndicLID: run LID and set status -----
+        try:
+            from indiclid_wrapper import IndicLIDWrapper
+        except Exception as e:
+            logger.error("IndicLID not available: %s. See requirements.txt.", e)
+            return
+        lid = IndicLIDWrapper(model_dir=CONFIG["model_dir"])
+        n_to_lid = count_tracks_missing_lid(conn)
+        logger.info("Running IndicLID on %d tracks...", n_to_lid)
+        to_lid = iter_tracks_missing_lid(conn)
+        for track_id, body in tqdm(to_lid, desc="LID", total=n_to_lid):
+            lyrics = decompress_lyrics(body)
+            line_scores = lid.predict_lines(lyrics)
+            writer.write_lid_result(track_id, line_scores, aggregate_line_scores(line_scores))
 
     # ----- 4) Needs-review CSV -----
     review_rows = get_tracks_for_review(conn)
@@ -428,20 +1897,97 @@ def run():
         logger.info("Wrote %d songs to %s", len(df), CONFIG["songs_csv"])
 
     # ----- 6) Per-language playlists -----
-    for lang_name, lang_codes in LANGUAGE_PLAYLISTS.items():
-        track_ids = get_track_uris_for_language(conn, lang_codes)
-        if not track_ids:
+    members = get_track_ids_by_language(conn, LANGUAGE_PLAYLISTS)
+    to_sync = []
+    for lang_name in LANGUAGE_PLAYLISTS:
+        playlist_title = f"{CONFIG['playlist_name']} - {lang_name}"
+        uris = [f"spotify:track:{tid}" for tid in members[lang_name]]
+        digest = membership_hash(uris)
+        cached = get_cached_playlist(conn, playlist_title)
+        if cached and cached[2] == digest:
+            logger.info("Playlist '%s' unchanged (%d tracks); skipping.", playlist_title, len(uris))
+            continue
+        if not uris and not cached:
             logger.info("No tracks for '%s'; skipping playlist.", lang_name)
             continue
-        playlist_title = f"{CONFIG['playlist_name']} - {lang_name}"
-        playlist_id = find_or_create_playlist(sp, playlist_title, description=f"{lang_name} tracks from Liked Songs")
-        uris = [f"spotify:track:{tid}" for tid in track_ids]
-        replace_playlist_tracks(sp, playlist_id, uris)
-        logger.info("Updated playlist '%s' with %d tracks.", playlist_title, len(uris))
+        to_sync.append((lang_name, playlist_title, uris, digest, cached))
+    # Cached IDs are trusted as-is; all other titles are resolved in a single walk of the user's playlists
+    resolved = find_or_create_playlists(
+        sp, {title: f"{lang_name} tracks from Liked Songs" for lang_name, title, _u, _d, cached in to_sync if not cached}
+    )
+    for lang_name, playlist_title, uris, digest, cached in to_sync:
+        playlist_id = cached[0] if cached else resolved[playlist_title]
+        try:
+            added, removed, snapshot_id = replace_playlist_tracks(sp, playlist_id, uris)
+        except SpotifyException as e:
+            if not cached or e.http_status != 404:
+                raise
+            logger.info("Cached playlist '%s' no longer exists; resolving again.", playlist_title)
+            forget_playlist(conn, playlist_title)
+            cached = None
+            playlist_id = find_or_create_playlist(sp, playlist_title, description=f"{lang_name} tracks from Liked Songs")
+            added, removed, snapshot_id = replace_playlist_tracks(sp, playlist_id, uris)
+        save_playlist(conn, playlist_title, playlist_id, snapshot_id or (cached[1] if cached else None), digest)
+        logger.info("Updated playlist '%s' with %d tracks (+%d, -%d).", playlist_title, len(uris), added, removed)
 
     conn.close()
+    logger.info("Spotify requests: %s", sp.stats())
     logger.info("Done.")
 
 
+def reaggregate() -> None:
+    """Recompute per-language confidences and statuses from stored per-line LID scores (no model run)."""
+    conn = get_conn()
+    init_db(conn)
+    start = time.monotonic()
+    n = 0
+    with DBWriter() as writer:
+        for track_id, line_scores in iter_line_scores(conn):
+            writer.write_language_result(track_id, aggregate_line_scores(line_scores))
+            n += 1
+    without = conn.execute(
+        "SELECT COUNT(*) FROM tracks WHERE language_confidences IS NOT NULL"
+        " AND track_id NOT IN (SELECT track_id FROM lid_line_scores)"
+    ).fetchone()[0]
+    conn.close()
+    logger.info("Re-aggregated %d tracks from stored line scores in %.1fs.", n, time.monotonic() - start)
+    if without:
+        logger.info("%d tracks were classified before line scores were stored; clear their language_confidences to re-run LID.", without)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--full-sync", action="store_true", help="page through all Liked Songs instead of stopping at the watermark"
+    )
+    sub = parser.add_subparsers(dest="command")
+    sub.add_parser("run", help="full pipeline (default)")
+    sub.add_parser("reaggregate", help="recompute language confidences and statuses from stored per-line LID scores")
+    sub.add_parser("reclassify", help="recompute add/review/skip statuses from stored confidences with current thresholds")
+    p_import = sub.add_parser("import-lyrics", help="bulk-load lyrics from a directory of .txt/.lrc files or a JSONL file")
+    p_import.add_argument("path", help="corpus directory or JSONL file")
+    p_import.add_argument("--batch", type=int, default=5000, help="tracks written per transaction (default 5000)")
+    args = parser.parse_args()
+    if args.command == "reaggregate":
+        reaggregate()
+    elif args.command == "import-lyrics":
+        conn = get_conn()
+        init_db(conn)
+        start = time.monotonic()
+        counts = import_lyrics(conn, args.path, batch_size=args.batch)
+        conn.close()
+        n_tracks = counts.pop("tracks")
+        logger.info("Imported lyrics for %d tracks in %.1fs; entries by match: %s.", n_tracks, time.monotonic() - start, counts)
+    elif args.command == "reclassify":
+        conn = get_conn()
+        init_db(conn)
+        start = time.monotonic()
+        n = reclassify(conn)
+        conn.close()
+        logger.info("Reclassified %d tracks in %.1fs.", n, time.monotonic() - start)
+    else:
+        run(full_sync=args.full_sync)
+
+
 if __name__ == "__main__":
-    run()
+    main()
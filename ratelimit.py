@@ -0,0 +1,227 @@
+"""
+Rate control shared by the Spotify and Genius request layers.
+- AIMDPacer: adaptive spacing between calls; zero delay until the API actually throttles.
+- TokenBucket: fixed request rate shared by a pool of worker threads.
+- AdaptiveRateLimiter: AIMD control of a TokenBucket's rate between a floor and a ceiling.
+- retry_after_seconds / backoff_delay: Retry-After parsing and jittered exponential backoff.
+"""
+from __future__ import annotations
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+
+def retry_after_seconds(value, default: float | None = None) -> float | None:
+    """Parse a Retry-After header value (delta-seconds or HTTP-date) into seconds."""
+    if value is None or value == "":
+        return default
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(str(value)).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """Exponential backoff with +/-50% jitter so concurrent retries don't line up."""
+    return min(cap, base * (2 ** attempt)) * random.uniform(0.5, 1.5)
+
+
+class AIMDPacer:
+    """
+    Thread-safe pacing between calls using additive-increase / multiplicative-decrease on the rate.
+    The interval between calls starts at 0 (no sleeping at all). Each throttle multiplies it by
+    `factor` (at least `min_interval`) and holds every caller until Retry-After has passed; every
+    `recover_after` consecutive successes subtract `step` seconds, walking back to the fastest
+    sustainable rate. Time spent waiting is counted in throttled_seconds.
+    """
+
+    def __init__(
+        self,
+        step: float = 0.05,
+        factor: float = 2.0,
+        min_interval: float = 0.1,
+        max_interval: float = 30.0,
+        recover_after: int = 10,
+    ):
+        self.step = step
+        self.factor = factor
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.recover_after = recover_after
+        self.interval = 0.0
+        self.calls = 0
+        self.throttles = 0
+        self.throttled_seconds = 0.0
+        self._streak = 0
+        self._next_slot = 0.0
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> float:
+        """Block until this caller's slot; returns the seconds slept (0.0 when not throttled)."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot, self._resume_at)
+            self._next_slot = slot + self.interval
+            self.calls += 1
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+            with self._lock:
+                self.throttled_seconds += delay
+        return delay
+
+    def on_success(self) -> None:
+        with self._lock:
+            self._streak += 1
+            if self.interval > 0 and self._streak >= self.recover_after:
+                self.interval = max(0.0, self.interval - self.step)
+                self._streak = 0
+
+    def on_throttle(self, retry_after: float | None = None) -> None:
+        with self._lock:
+            self.throttles += 1
+            self._streak = 0
+            self.interval = min(self.max_interval, max(self.min_interval, self.interval * self.factor))
+            if retry_after:
+                self._resume_at = max(self._resume_at, time.monotonic() + retry_after)
+
+    def snapshot(self) -> dict[str, float]:
+        """Live counters for logging / progress bars."""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "throttles": self.throttles,
+                "throttled_seconds": round(self.throttled_seconds, 2),
+                "interval": round(self.interval, 3),
+                "rate_per_s": round(1 / self.interval, 2) if self.interval else float("inf"),
+            }
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens/s refill up to `burst`, and acquire() blocks until the
+    caller's token is due. Callers reserve tokens in arrival order, so N workers sharing one bucket
+    together never exceed `rate`. A rate <= 0 disables limiting.
+    """
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = burst
+        self.acquired = 0
+        self.waited_seconds = 0.0
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        if self.rate > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def set_rate(self, rate: float) -> None:
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+
+    def hold(self, seconds: float) -> None:
+        """Hand out no tokens for `seconds` (e.g. a Retry-After), on top of the normal rate."""
+        with self._lock:
+            self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+    def hold_remaining(self) -> float:
+        with self._lock:
+            return max(0.0, self._resume_at - time.monotonic())
+
+    def acquire(self) -> float:
+        """Take one token; returns the seconds slept waiting for it."""
+        with self._lock:
+            self.acquired += 1
+            now = time.monotonic()
+            delay = max(0.0, self._resume_at - now)
+            if self.rate > 0:
+                self._refill(now)
+                self._tokens -= 1
+                if self._tokens < 0:
+                    delay = max(delay, -self._tokens / self.rate)
+            self.waited_seconds += delay
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+class AdaptiveRateLimiter:
+    """
+    TokenBucket whose rate is steered by AIMD: each throttle halves it (not below `min_rate`) and
+    holds all callers for Retry-After; every `recover_after` consecutive successes add `step`
+    tokens/s, up to `max_rate`. Unlike AIMDPacer it starts at a configured rate rather than unpaced,
+    for APIs whose budget is known up front.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        min_rate: float = 0.1,
+        max_rate: float | None = None,
+        step: float = 0.1,
+        factor: float = 0.5,
+        recover_after: int = 10,
+    ):
+        self.bucket = TokenBucket(rate)
+        self.min_rate = min_rate
+        self.max_rate = max(rate, max_rate or rate)
+        self.step = step
+        self.factor = factor
+        self.recover_after = recover_after
+        self.successes = 0
+        self.throttles = 0
+        self.errors: dict[str, int] = {}
+        self._streak = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        return self.bucket.acquire()
+
+    def on_success(self) -> None:
+        with self._lock:
+            self.successes += 1
+            self._streak += 1
+            if self._streak < self.recover_after or self.bucket.rate >= self.max_rate:
+                return
+            self._streak = 0
+            rate = min(self.max_rate, self.bucket.rate + self.step)
+        self.bucket.set_rate(rate)
+
+    def on_throttle(self, retry_after: float | None = None) -> None:
+        with self._lock:
+            self.throttles += 1
+            self._streak = 0
+            rate = max(self.min_rate, self.bucket.rate * self.factor)
+        self.bucket.set_rate(rate)
+        if retry_after:
+            self.bucket.hold(retry_after)
+
+    def on_error(self, kind: str) -> None:
+        """Count a failed call by kind (throttles also go through on_throttle())."""
+        with self._lock:
+            self._streak = 0
+            self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def snapshot(self) -> dict[str, object]:
+        """Live rate and backoff state for logging / progress bars."""
+        with self._lock:
+            return {
+                "rate_per_s": round(self.bucket.rate, 3),
+                "successes": self.successes,
+                "throttles": self.throttles,
+                "hold_s": round(self.bucket.hold_remaining(), 1),
+                "waited_s": round(self.bucket.waited_seconds, 1),
+                "errors": dict(self.errors),
+            }
@@ -0,0 +1,110 @@
+"""
+Persistent cache for API responses (Genius search results and lyrics pages).
+One SQLite file, values stored as zlib-compressed JSON, with a TTL (optionally shorter per entry)
+and a size cap enforced by evicting the least recently used entries. Safe to share between worker
+threads.
+"""
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+# Returned by get() on a miss, so a cached None (e.g. "no lyrics on this page") is still a hit
+MISS = object()
+
+# accessed_at is only rewritten when older than this, so hot keys don't turn every read into a write
+_TOUCH_INTERVAL = 3600.0
+
+
+class ResponseCache:
+    def __init__(self, path: str, ttl_seconds: float, max_bytes: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                expires_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at);
+        """)
+        if "expires_at" not in {row[1] for row in self._conn.execute("PRAGMA table_info(responses)")}:
+            self._conn.execute("ALTER TABLE responses ADD COLUMN expires_at REAL")
+        now = time.time()
+        self._conn.execute("DELETE FROM responses WHERE expires_at < ?", (now,))
+        if ttl_seconds > 0:
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - ttl_seconds,))
+        self._bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, key: str, default=MISS):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, size, created_at, accessed_at, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and (
+                (self.ttl_seconds > 0 and row[2] < now - self.ttl_seconds) or (row[4] is not None and row[4] < now)
+            ):
+                self._delete([(key, row[1])])
+                row = None
+            if row is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            if row[3] < now - _TOUCH_INTERVAL:
+                self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, key: str, value, ttl_seconds: float | None = None) -> None:
+        """Store `value`; `ttl_seconds` expires this entry sooner than the cache-wide TTL."""
+        body = zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"), 6)
+        now = time.time()
+        expires_at = now + ttl_seconds if ttl_seconds is not None else None
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, body, size, created_at, accessed_at, expires_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, body, len(body), now, now, expires_at),
+            )
+            self._bytes += len(body) - (old[0] if old else 0)
+            if self.max_bytes > 0 and self._bytes > self.max_bytes:
+                self._evict(int(self.max_bytes * 0.9))
+
+    def _evict(self, target_bytes: int) -> None:
+        """Drop least recently used entries until the cache is under target_bytes (caller holds the lock)."""
+        victims, freed = [], 0
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            if self._bytes - freed <= target_bytes:
+                break
+            victims.append((key, size))
+            freed += size
+        self._delete(victims)
+        self.evictions += len(victims)
+
+    def _delete(self, rows: list[tuple[str, int]]) -> None:
+        """Delete (key, size) rows and keep the byte count in step (caller holds the lock)."""
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", [(k,) for k, _size in rows])
+        self._bytes -= sum(size for _k, size in rows)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "bytes": self._bytes}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()